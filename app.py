@@ -1,23 +1,103 @@
-import json, os, sys
+import asyncio, itertools, json, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
 
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-from config import SUMMARIES_FILE, MIN_INPUT_WORDS
-from summarizer import summarize, InputTooShortError, NotHealthContentError
-from evaluator import evaluate
+from config import (
+    MIN_INPUT_WORDS, BATCH_CONCURRENCY, EVAL_WORKERS, RAW_ARTICLES_DIR,
+    WARM_UP_ON_STARTUP, WARM_UP_RETRY_SECONDS,
+)
+import evaluator, summarizer
+from summarizer import (
+    summarize, summarize_async, close_async_client, request_key,
+    InputTooShortError, NotHealthContentError,
+)
+from evaluator import evaluate, evaluate_batch
 from risk import compute_risk
+from metrics import RISK_SECONDS, RECORDS, SUMMARY_COALESCED, render as render_metrics
+from manifest import scan, article_ids, save_manifest
+from store import ResultStore
+from profiles import get_profile, profile_batch
+from jobs import JobManager
+from singleflight import SingleFlight
 from utils import (
-    count_words, load_articles,
-    save_summaries_json, save_evaluation_csv, ensure_dirs,
+    count_words, iter_articles, load_summaries_json, load_reference,
+    open_exports, save_results, ensure_dirs,
 )
 
-app = FastAPI(title="HEAL-Summ-Lite", version="1.0.0")
+# NER and readability are CPU-bound; keep them off the event loop
+_eval_pool = ThreadPoolExecutor(max_workers=EVAL_WORKERS, thread_name_prefix="eval")
+
+
+# warm-up state per component: "pending", "loading", "ready", "skipped"
+# (warm-up disabled; loaded on first use) or "failed: ..."
+_warm = {"nlp": "pending", "llm": "pending"}
+_warmers = {"nlp": evaluator, "llm": summarizer}
+_retry_at = {}     # component -> monotonic time it may be re-probed
+_retries = set()   # re-probe tasks started from /api/ready
+
+
+async def _warm_one(name):
+    _warm[name] = "loading"
+    try:
+        await _offload(_warmers[name].warm_up)
+        _warm[name] = "ready"
+    except Exception as exc:
+        _warm[name] = f"failed: {exc}"
+        _retry_at[name] = time.monotonic() + WARM_UP_RETRY_SECONDS
+
+
+async def _warm_up():
+    await asyncio.gather(*(_warm_one(name) for name in _warm))
+
+
+def _retry_failed():
+    """Re-probe failed components in the background once their backoff is over."""
+    now = time.monotonic()
+    for name, state in _warm.items():
+        if state.startswith("failed") and now >= _retry_at.get(name, 0):
+            _warm[name] = "loading"
+            task = asyncio.create_task(_warm_one(name))
+            _retries.add(task)
+            task.add_done_callback(_retries.discard)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARM_UP_ON_STARTUP:
+        task = asyncio.create_task(_warm_up())
+    else:
+        task = None
+        _warm.update(dict.fromkeys(_warm, "skipped"))
+    _jobs.resume()
+    yield
+    _jobs.shutdown()
+    for t in [task, *_retries]:
+        if t:
+            t.cancel()
+    await close_async_client()
+    _eval_pool.shutdown(wait=False)
+
+
+app = FastAPI(title="HEAL-Summ-Lite", version="1.0.0", lifespan=lifespan)
 ensure_dirs()
 
+_store = ResultStore()
+if _store.is_new:
+    # carry over history from the old read-modify-write summaries.json
+    _store.append_many(load_summaries_json())
+
+
+async def _offload(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_eval_pool, fn, *args)
+
 PAGE = """<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -108,39 +188,53 @@ async function run(){
   st.textContent='Working…';st.className='msg'
   $('#out').style.display='none'
   try{
-    var r=await fetch('/api/batch',{method:'POST'})
+    var r=await fetch('/api/batch/stream',{method:'POST'})
     if(!r.ok){var e=await r.json();throw new Error(e.error||r.statusText)}
-    var d=await r.json()
-    st.innerHTML='Processed <b>'+d.count+'</b> article(s).'
-    show(d.records)
+    var rd=r.body.getReader(),dec=new TextDecoder(),buf='',n=0
+    table()
+    for(;;){
+      var c=await rd.read()
+      if(c.done)break
+      buf+=dec.decode(c.value,{stream:true})
+      var lines=buf.split('\\n');buf=lines.pop()
+      lines.forEach(function(l){
+        if(!l)return
+        var m=JSON.parse(l)
+        if(m.type==='error')throw new Error(m.error)
+        if(m.type==='record')row(m.record,n++)
+        if(m.type==='record'||m.type==='skip')
+          st.innerHTML='Processed <b>'+m.done+'</b>'+(m.total!=null?' of '+m.total:'')+
+            ' &middot; '+m.rate.toFixed(2)+' articles/s'
+        if(m.type==='done')
+          st.innerHTML='Processed <b>'+m.count+'</b> article(s) in '+m.elapsed.toFixed(1)+' s.'
+      })
+    }
   }catch(e){st.textContent=e.message;st.className='msg err'}
   finally{b.disabled=false;sp.style.display='none'}
 }
 
-function show(rows){
-  if(!rows||!rows.length)return
-  $('#out').style.display=''
-  var h='<table><thead><tr>'+
+function table(){
+  $('#tbl').innerHTML='<table><thead><tr>'+
     '<th>Article</th><th>Summary</th><th>Words</th><th>Target</th><th>FKGL</th>'+
     '<th>Coverage</th><th>Missing&nbsp;#</th><th>Halluc.</th><th>Risk</th><th>Escalate</th>'+
-    '</tr></thead><tbody>'
-  rows.forEach(function(r,i){
-    var c=r.risk_level==='Low'?'low':r.risk_level==='Medium'?'med':'hi'
-    var s=r.summary||''
-    var p=s.length>100?esc(s.slice(0,100))+'&hellip;':esc(s)
-    h+='<tr><td><b>'+esc(r.article_id)+'</b></td>'+
-      '<td class="sum"><div class="peek" id="p'+i+'">'+p+'</div>'+
-      (s.length>100?'<button class="more" onclick="tog('+i+',this)" data-f="'+attr(s)+'">more</button>':'')+
-      '</td>'+
-      '<td>'+r.word_count+'</td><td>'+(r.target_range||'')+'</td><td>'+r.fkgl+'</td>'+
-      '<td>'+(r.entity_coverage*100).toFixed(1)+'%</td>'+
-      '<td>'+(r.missing_numbers?'Yes':'No')+'</td>'+
-      '<td>'+(r.hallucination_flag?'Yes':'No')+'</td>'+
-      '<td><span class="tag '+c+'">'+r.risk_level+'</span></td>'+
-      '<td>'+(r.escalate?'Yes':'No')+'</td></tr>'
-  })
-  h+='</tbody></table>'
-  $('#tbl').innerHTML=h
+    '</tr></thead><tbody id="rows"></tbody></table>'
+}
+
+function row(r,i){
+  $('#out').style.display=''
+  var c=r.risk_level==='Low'?'low':r.risk_level==='Medium'?'med':'hi'
+  var s=r.summary||''
+  var p=s.length>100?esc(s.slice(0,100))+'&hellip;':esc(s)
+  $('#rows').insertAdjacentHTML('beforeend','<tr><td><b>'+esc(r.article_id)+'</b></td>'+
+    '<td class="sum"><div class="peek" id="p'+i+'">'+p+'</div>'+
+    (s.length>100?'<button class="more" onclick="tog('+i+',this)" data-f="'+attr(s)+'">more</button>':'')+
+    '</td>'+
+    '<td>'+r.word_count+'</td><td>'+(r.target_range||'')+'</td><td>'+r.fkgl+'</td>'+
+    '<td>'+(r.entity_coverage*100).toFixed(1)+'%</td>'+
+    '<td>'+(r.missing_numbers?'Yes':'No')+'</td>'+
+    '<td>'+(r.hallucination_flag?'Yes':'No')+'</td>'+
+    '<td><span class="tag '+c+'">'+r.risk_level+'</span></td>'+
+    '<td>'+(r.escalate?'Yes':'No')+'</td></tr>')
 }
 
 function tog(i,btn){
@@ -165,6 +259,19 @@ async def index():
     return PAGE
 
 
+@app.get("/api/ready")
+async def api_ready():
+    _retry_failed()
+    ready = all(v in ("ready", "skipped") for v in _warm.values())
+    body = {"ready": ready, **_warm, "backends": summarizer.backend_status()}
+    return JSONResponse(body, 200 if ready else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/api/summarize")
 async def api_summarize(req: Request):
     body = await req.json()
@@ -176,72 +283,347 @@ async def api_summarize(req: Request):
             {"error": f"Article too short — need at least {MIN_INPUT_WORDS} words."},
             422,
         )
+    refresh = bool(body.get("refresh", False))
     try:
-        summ = summarize(text)
+        (summ, evl, rsk), shared = await _flights.run(
+            request_key(text, refresh), lambda: _summarize_pipeline(text, refresh),
+        )
     except (InputTooShortError, NotHealthContentError) as exc:
         return JSONResponse({"error": str(exc)}, 422)
+    if shared:
+        SUMMARY_COALESCED.inc()
 
-    evl = evaluate(text, summ["summary"])
-    rsk = compute_risk(evl, summ["word_count"], summ["target_min"], summ["target_max"])
+    # every caller gets (and logs) its own record, even when the work was shared
     rec = _record("interactive", summ, evl, rsk)
-    _append(rec)
+    await _offload(_append, rec)
     return JSONResponse(rec)
 
 
-@app.post("/api/batch")
-async def api_batch():
-    articles = load_articles()
-    if not articles:
-        return JSONResponse({"error": "No .txt files in data/raw_articles/"}, 404)
+# identical /api/summarize requests that arrive while one is running wait
+# for it instead of generating the same summary again
+_flights = SingleFlight()
+
+
+async def _summarize_pipeline(text, refresh):
+    summ = await summarize_async(text, use_cache=not refresh)
+    evl = await _offload(evaluate, text, summ["summary"])
+    return summ, evl, _risk(evl, summ)
+
+
+async def _process_articles(articles, refresh=False):
+    sem = asyncio.Semaphore(BATCH_CONCURRENCY)
 
+    async def one(art, prof):
+        async with sem:
+            try:
+                summ = await summarize_async(art["text"], use_cache=not refresh, profile=prof)
+                return art, prof, summ
+            except (InputTooShortError, NotHealthContentError):
+                return None
+
+    # source-side analysis comes from data/processed, built here on first sight
+    profiles = await _offload(profile_batch, [a["text"] for a in articles])
+    # gather keeps input order regardless of which generation finishes first
+    done = [r for r in await asyncio.gather(*map(one, articles, profiles)) if r]
+
+    evals = await _offload(
+        lambda: evaluate_batch(
+            [(art["text"], summ["summary"]) for art, _, summ in done],
+            [load_reference(art["id"]) for art, _, _ in done],
+            profiles=[prof for _, prof, _ in done],
+        )
+    )
     records = []
-    for art in articles:
-        try:
-            summ = summarize(art["text"])
-        except (InputTooShortError, NotHealthContentError):
-            continue
-        evl = evaluate(art["text"], summ["summary"])
-        rsk = compute_risk(evl, summ["word_count"], summ["target_min"], summ["target_max"])
+    for (art, _, summ), evl in zip(done, evals):
+        rsk = _risk(evl, summ)
         records.append(_record(art["id"], summ, evl, rsk))
+    return records
+
 
-    save_summaries_json(records)
-    save_evaluation_csv(records)
+@app.post("/api/batch")
+async def api_batch(
+    refresh: bool = False, incremental: bool = False,
+    shard: Optional[int] = None, num_shards: Optional[int] = None,
+    start: int = 0, stop: Optional[int] = None,
+):
+    if incremental and not refresh:
+        return await _batch_incremental()
+
+    bad = _slice_error(shard, num_shards, start, stop)
+    if bad:
+        return JSONResponse({"error": bad}, 422)
+    sliced = bool(num_shards) or start or stop is not None
+    if not sliced:
+        # snapshot before reading, so a file edited mid-run keeps its old hash
+        # and the next incremental run picks the edit up
+        _, _, manifest = await _offload(scan, RAW_ARTICLES_DIR, {})
+    articles = await _offload(lambda: list(iter_articles(
+        RAW_ARTICLES_DIR, shard=shard, num_shards=num_shards, start=start, stop=stop,
+    )))
+    if not articles:
+        return JSONResponse({"error": "No articles in data/raw_articles/"}, 404)
+
+    records = await _process_articles(articles, refresh)
+    await _offload(_store.append_many, records)
+    # a slice only covers part of the corpus: it lands in the store, but must
+    # not replace the full exports or become the incremental baseline
+    if not sliced:
+        await _offload(save_results, records)
+        # a full run is a valid baseline for the next incremental one
+        await _offload(save_manifest, manifest)
     return JSONResponse({"count": len(records), "records": records})
 
 
+@app.post("/api/batch/stream")
+async def api_batch_stream(
+    refresh: bool = False,
+    shard: Optional[int] = None, num_shards: Optional[int] = None,
+    start: int = 0, stop: Optional[int] = None,
+):
+    """Like /api/batch, but emits each record as NDJSON as soon as it is scored.
+
+    Articles are read lazily as work frees up, so huge directories never
+    sit in memory all at once.
+    """
+    bad = _slice_error(shard, num_shards, start, stop)
+    if bad:
+        return JSONResponse({"error": bad}, 422)
+    sliced = bool(num_shards) or start or stop is not None
+    it = iter_articles(RAW_ARTICLES_DIR, shard=shard, num_shards=num_shards, start=start, stop=stop)
+    first = await _offload(next, it, None)
+    if first is None:
+        return JSONResponse({"error": "No articles in data/raw_articles/"}, 404)
+    return StreamingResponse(
+        _stream_batch(itertools.chain([first], it), refresh, exports=not sliced),
+        media_type="application/x-ndjson",
+    )
+
+
+async def _stream_batch(articles, refresh, exports=True):
+    sem = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def one(art):
+        prof = await _offload(get_profile, art["text"])
+        async with sem:
+            try:
+                summ = await summarize_async(art["text"], use_cache=not refresh, profile=prof)
+            except (InputTooShortError, NotHealthContentError):
+                return None
+        evl = await _offload(
+            evaluate, art["text"], summ["summary"], load_reference(art["id"]), None, prof,
+        )
+        rsk = _risk(evl, summ)
+        return _record(art["id"], summ, evl, rsk)
+
+    def line(**msg):
+        return json.dumps(msg) + "\n"
+
+    # total is unknown (null) until the article iterator runs dry
+    seen, done, total, started = 0, 0, None, time.perf_counter()
+    # exports are written row by row in completion order and only replace
+    # the previous files once the whole run has finished; sliced runs skip them
+    out = open_exports() if exports else None
+    count = 0
+    window = BATCH_CONCURRENCY * 2   # read ahead just enough to keep the workers busy
+    pending = set()
+    yield line(type="start", total=total)
+    try:
+        while True:
+            while total is None and len(pending) < window:
+                art = await _offload(next, articles, None)
+                if art is None:
+                    total = seen
+                    break
+                seen += 1
+                pending.add(asyncio.create_task(one(art)))
+            if not pending:
+                break
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for fut in finished:
+                rec = fut.result()
+                done += 1
+                elapsed = time.perf_counter() - started
+                if rec is not None:
+                    if out:
+                        out.write(rec)
+                    await _offload(_append, rec)
+                    count += 1
+                yield line(
+                    type="record" if rec is not None else "skip",
+                    record=rec, done=done, total=total,
+                    elapsed=round(elapsed, 3), rate=round(done / elapsed, 3),
+                )
+    except Exception as exc:
+        if out:
+            out.close(commit=False)
+        yield line(type="error", error=str(exc))
+        return
+    except BaseException:
+        if out:
+            out.close(commit=False)
+        raise
+    finally:
+        # client went away or a generation failed: stop the rest
+        for t in pending:
+            t.cancel()
+
+    if out:
+        out.close()
+    yield line(
+        type="done", count=count, total=total,
+        elapsed=round(time.perf_counter() - started, 3),
+    )
+
+
+async def _batch_incremental():
+    """Only re-run new or edited articles and merge them into the saved results."""
+    # no manifest argument: scan() loads the saved one, off the event loop
+    changed, deleted, manifest = await _offload(scan, RAW_ARTICLES_DIR)
+    if not manifest["files"]:
+        return JSONResponse({"error": "No articles in data/raw_articles/"}, 404)
+
+    fresh = await _process_articles(changed)
+    live_ids = article_ids(manifest)
+    redone = {a["id"] for a in changed}
+    kept = [
+        r for r in await _offload(load_summaries_json)
+        if r["article_id"] in live_ids and r["article_id"] not in redone
+    ]
+    records = sorted(kept + fresh, key=lambda r: r["article_id"])
+
+    await _offload(_store.append_many, fresh)
+    if changed or deleted:
+        await _offload(save_results, records)
+    await _offload(save_manifest, manifest)
+    return JSONResponse({
+        "count": len(records),
+        "processed": len(fresh),
+        "deleted": deleted,
+        "records": records,
+    })
+
+
+@app.post("/api/jobs")
+async def api_jobs_create(refresh: bool = False):
+    job_id = await _offload(_jobs.submit, refresh)
+    if job_id is None:
+        return JSONResponse({"error": "No articles in data/raw_articles/"}, 404)
+    return JSONResponse({"job_id": job_id}, 202)
+
+
+@app.get("/api/jobs")
+async def api_jobs_list():
+    return JSONResponse(await _offload(_jobs.list))
+
+
+@app.get("/api/jobs/{job_id}")
+async def api_job_status(job_id: str):
+    state = await _offload(_jobs.get, job_id)
+    if state is None:
+        return JSONResponse({"error": "Unknown job."}, 404)
+    return JSONResponse(state)
+
+
+@app.get("/api/jobs/{job_id}/records")
+async def api_job_records(job_id: str):
+    records = await _offload(_jobs.records, job_id)
+    if records is None:
+        return JSONResponse({"error": "Unknown job."}, 404)
+    return JSONResponse(records)
+
+
+@app.post("/api/jobs/{job_id}/cancel")
+async def api_job_cancel(job_id: str):
+    if not await _offload(_jobs.cancel, job_id):
+        return JSONResponse({"error": "Unknown or finished job."}, 404)
+    return JSONResponse({"job_id": job_id, "cancelling": True})
+
+
 @app.get("/api/results")
-async def api_results():
-    if not os.path.exists(SUMMARIES_FILE):
-        return JSONResponse([])
-    with open(SUMMARIES_FILE) as f:
-        return JSONResponse(json.load(f))
+async def api_results(
+    limit: int = 100,
+    offset: int = 0,
+    risk_level: Optional[str] = None,
+    escalate: Optional[bool] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    filters = {"risk_level": risk_level, "escalate": escalate, "since": since, "until": until}
+    page = await _offload(_page, limit, offset, filters)
+    return JSONResponse(page["items"], headers={"X-Total-Count": str(page["total"])})
+
+
+def _page(limit, offset, filters):
+    return {
+        "items": _store.query(limit=min(max(limit, 1), 1000), offset=max(offset, 0), **filters),
+        "total": _store.count(**filters),
+    }
+
+
+def _slice_error(shard, num_shards, start, stop):
+    """Why a shard/range selection is invalid, or None when it is fine."""
+    if num_shards is not None and num_shards < 1:
+        return "num_shards must be at least 1."
+    if (shard is None) != (num_shards is None):
+        return "shard and num_shards must be given together."
+    if num_shards and not 0 <= shard < num_shards:
+        return f"shard must be between 0 and {num_shards - 1}."
+    if start < 0 or (stop is not None and stop < start):
+        return "start must be >= 0 and stop must not be below start."
+    return None
+
+
+def _risk(evl, summ):
+    t = {}
+    with RISK_SECONDS.time(t, "risk"):
+        rsk = compute_risk(evl, summ["word_count"], summ["target_min"], summ["target_max"])
+    rsk["timings"] = t
+    return rsk
 
 
 def _record(aid, summ, evl, rsk):
+    RECORDS.inc(source="interactive" if aid == "interactive" else "batch")
     return {
         "article_id": aid,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
         "summary": summ["summary"],
         "word_count": summ["word_count"],
         "target_range": f"{summ['target_min']}-{summ['target_max']}",
         "retries": summ["retries"],
+        "candidates": summ.get("candidates", summ["retries"] + 1),
+        "wasted_tokens": summ.get("wasted_tokens", 0),
         "fkgl": evl["fkgl"],
         "fre": evl["fre"],
         "entity_coverage": evl["entity_coverage"],
         "missing_numbers": evl["missing_numbers"],
         "hallucination_flag": evl["hallucination_flag"],
         "hallucinated_entities": evl["hallucinated_entities"],
+        "rouge": evl["rouge"],
+        "toxicity": evl["toxicity"],
+        "toxicity_flag": evl["toxicity_flag"],
         "risk_level": rsk["risk_level"],
         "escalate": rsk["escalate"],
+        "timings": {**summ.get("timings", {}), **evl.get("timings", {}), **rsk["timings"]},
     }
 
 
 def _append(rec):
-    records = []
-    if os.path.exists(SUMMARIES_FILE):
-        with open(SUMMARIES_FILE) as f:
-            try:
-                records = json.load(f)
-            except json.JSONDecodeError:
-                records = []
-    records.append(rec)
-    save_summaries_json(records)
+    _store.append(rec)
+
+
+def _process_one(art, refresh=False):
+    """Full pipeline for one article, synchronously (used by background jobs)."""
+    prof = get_profile(art["text"])
+    try:
+        summ = summarize(art["text"], use_cache=not refresh, profile=prof)
+    except (InputTooShortError, NotHealthContentError):
+        return None
+    evl = evaluate(art["text"], summ["summary"], load_reference(art["id"]), profile=prof)
+    return _record(art["id"], summ, evl, _risk(evl, summ))
+
+
+_jobs = JobManager(
+    _process_one,
+    on_record=_append,
+    on_finish=save_results,
+)
@@ -0,0 +1,186 @@
+"""Least-loaded routing over one or more Ollama servers.
+
+Each backend takes at most `max_inflight` generations at once, and a request
+goes to the backend with the lowest load. A backend that is unreachable or
+answers 5xx is ejected for `eject_seconds`, doubling per consecutive failure.
+After that it gets a single trial request, and a success puts it back in
+rotation. If every backend is ejected, each may still take one trial at a
+time, so a single-server setup keeps working through a blip.
+"""
+import asyncio, threading, time
+
+from config import (
+    OLLAMA_TIMEOUT, OLLAMA_BACKEND_CONCURRENCY, OLLAMA_EJECT_SECONDS, OLLAMA_EJECT_MAX_SECONDS,
+)
+from metrics import OLLAMA_BACKEND_FAILURES
+
+
+class NoBackendError(RuntimeError):
+    pass
+
+
+class Backend:
+    def __init__(self, url, max_inflight):
+        self.url = url.rstrip("/")
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.failures = 0          # consecutive; > 0 means ejected or on trial
+        self.ejected_until = 0.0
+
+    def available(self, now, panic):
+        if not self.failures:
+            return self.inflight < self.max_inflight
+        return self.inflight == 0 and (panic or now >= self.ejected_until)
+
+    def status(self):
+        return {
+            "url": self.url,
+            "inflight": self.inflight,
+            "healthy": not self.failures,
+            "failures": self.failures,
+        }
+
+
+class BackendPool:
+    def __init__(self, urls, max_inflight=OLLAMA_BACKEND_CONCURRENCY,
+                 eject_seconds=OLLAMA_EJECT_SECONDS, max_eject_seconds=OLLAMA_EJECT_MAX_SECONDS):
+        self.urls = tuple(urls)
+        self.backends = [Backend(u, max_inflight) for u in self.urls]
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self._cond = threading.Condition()
+        self._waiters = []   # (loop, future) of coroutines waiting for a slot
+        self._turn = 0
+
+    def _pick(self, exclude, prefer=None):
+        now = time.monotonic()
+        panic = all(b.failures for b in self.backends)
+        free = [
+            b for b in self.backends
+            if b.url not in exclude and b.available(now, panic)
+        ]
+        if not free:
+            return None
+        for b in free:
+            if b.url == prefer:
+                b.inflight += 1
+                return b
+        # rotate the tie-break so equally loaded backends share the work
+        self._turn += 1
+        n = len(self.backends)
+        b = min(free, key=lambda b: (
+            b.inflight / b.max_inflight, (self.backends.index(b) - self._turn) % n,
+        ))
+        b.inflight += 1
+        return b
+
+    def acquire(self, exclude=(), timeout=OLLAMA_TIMEOUT, prefer=None):
+        """Reserve a slot on the least-loaded backend (`prefer`red one first if it has room)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                b = self._pick(exclude, prefer)
+                if b:
+                    return b
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise NoBackendError(f"no Ollama backend free within {timeout}s")
+                # ejections run out without anyone calling release(), so poll too
+                self._cond.wait(min(left, 0.25))
+
+    async def acquire_async(self, exclude=(), timeout=OLLAMA_TIMEOUT, prefer=None):
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                b = self._pick(exclude, prefer)
+                if b:
+                    return b
+                fut = loop.create_future()
+                self._waiters.append((loop, fut))
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise NoBackendError(f"no Ollama backend free within {timeout}s")
+            try:
+                await asyncio.wait_for(fut, min(left, 0.25))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._cond:
+                    if (loop, fut) in self._waiters:
+                        self._waiters.remove((loop, fut))
+
+    def report(self, backend, ok):
+        """Record a success or a failure for `backend` without touching its load."""
+        with self._cond:
+            self._report(backend, ok)
+
+    def _report(self, backend, ok):
+        if ok:
+            backend.failures = 0
+            return
+        backend.failures += 1
+        backend.ejected_until = time.monotonic() + min(
+            self.eject_seconds * 2 ** (backend.failures - 1), self.max_eject_seconds,
+        )
+        OLLAMA_BACKEND_FAILURES.inc(backend=backend.url)
+
+    def release(self, backend, ok=None):
+        """Free a slot; ok=None (e.g. the caller was cancelled) says nothing about health."""
+        with self._cond:
+            backend.inflight -= 1
+            if ok is not None:
+                self._report(backend, ok)
+            self._cond.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(_wake, fut)
+
+    def call(self, fn, is_down, prefer=None):
+        """Run fn(url) on the least-loaded backend, failing over while `is_down(exc)` says so."""
+        tried = set()
+        while True:
+            b = self.acquire(tried, prefer=prefer)
+            try:
+                result = fn(b.url)
+            except Exception as exc:
+                down = is_down(exc)
+                self.release(b, ok=not down)
+                tried.add(b.url)
+                if not down or len(tried) == len(self.backends):
+                    raise
+                continue
+            except BaseException:
+                self.release(b)
+                raise
+            self.release(b, ok=True)
+            return result
+
+    async def call_async(self, fn, is_down, prefer=None):
+        """Async call(): `fn(url)` returns an awaitable."""
+        tried = set()
+        while True:
+            b = await self.acquire_async(tried, prefer=prefer)
+            try:
+                result = await fn(b.url)
+            except Exception as exc:
+                down = is_down(exc)
+                self.release(b, ok=not down)
+                tried.add(b.url)
+                if not down or len(tried) == len(self.backends):
+                    raise
+                continue
+            except BaseException:
+                self.release(b)
+                raise
+            self.release(b, ok=True)
+            return result
+
+    def status(self):
+        with self._cond:
+            return [b.status() for b in self.backends]
+
+
+def _wake(fut):
+    if not fut.done():
+        fut.set_result(None)
@@ -0,0 +1,187 @@
+"""Local stand-in for Ollama's /api/generate, for tests and benchmarks.
+
+Replies are built from words of the prompt itself, sized from the
+"<lo> to <hi> words" request in the prompt according to `mode`:
+
+- fit:   lands inside the window
+- over:  twice the upper bound
+- under: half the lower bound
+- cycle: over, then under, then fit, repeating per request
+
+Modes queued in `script` are used first, one per request.
+
+Finished replies carry a `context` handle and a `prompt_eval_count`. A request
+that sends a context back continues from that conversation: it is billed only
+for its new prompt tokens, and the reply reuses the original article's words.
+
+Run standalone with `python -m benchmarks.mock_ollama --port 11434`.
+"""
+import argparse, itertools, json, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_RANGE = re.compile(r"in (\d+) to (\d+) words")
+_AT_MOST = re.compile(r"at most (\d+) words")
+
+
+class MockOllama:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, token_rate=0.0, mode="fit"):
+        self.latency = latency          # seconds before the first token
+        self.token_rate = token_rate    # tokens per second, 0 = instant
+        self.mode = mode
+        self.script = []                # modes for the next requests, in order
+        self.fail = False               # answer 503 to everything while set
+        self.requests = []              # payload of every generate call
+        self.tokens_sent = 0
+        self.prompt_tokens = 0          # prompt tokens "evaluated" across all requests
+        self._contexts = []             # article words per handed-out context
+        self._cycle = itertools.cycle(["over", "under", "fit"])
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _length(self, prompt, num_predict):
+        with self._lock:
+            if self.script:
+                mode = self.script.pop(0)
+            else:
+                mode = next(self._cycle) if self.mode == "cycle" else self.mode
+        m = _RANGE.search(prompt)
+        if m:
+            lo, hi = int(m.group(1)), int(m.group(2))
+        else:
+            m = _AT_MOST.search(prompt)
+            lo = hi = int(m.group(1)) if m else 50
+        n = {"fit": (lo + hi) // 2, "over": hi * 2, "under": max(1, lo // 2)}[mode]
+        # one word per token is close enough for gemma-sized vocabularies
+        return min(n, num_predict) if num_predict else n
+
+    def _body(self, payload):
+        """Words to echo back and the prompt tokens this request costs."""
+        prompt = payload.get("prompt", "")
+        ctx = payload.get("context")
+        if ctx and isinstance(ctx[0], int) and 0 <= ctx[0] < len(self._contexts):
+            return self._contexts[ctx[0]], len(prompt.split())
+        cost = len(payload.get("system", "").split()) + len(prompt.split())
+        return prompt.split("\n\n", 1)[-1].split() or ["health"], cost
+
+    def _reply_words(self, body, n):
+        return [body[i % len(body)] for i in range(n)]
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, code, obj):
+                data = json.dumps(obj).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if mock.fail:
+                    return self._json(503, {"error": "unavailable"})
+                if self.path == "/api/tags":
+                    return self._json(200, {"models": [{"name": "mock"}]})
+                self._json(404, {"error": "not found"})
+
+            def do_POST(self):
+                size = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(size) or b"{}")
+                if mock.fail:
+                    return self._json(503, {"error": "unavailable"})
+                if self.path != "/api/generate":
+                    return self._json(404, {"error": "not found"})
+                with mock._lock:
+                    mock.requests.append(payload)
+
+                prompt = payload.get("prompt", "")
+                if not prompt:   # load-only request
+                    return self._json(200, {"model": payload.get("model"), "done": True})
+
+                num_predict = payload.get("options", {}).get("num_predict")
+                with mock._lock:
+                    body, cost = mock._body(payload)
+                    mock.prompt_tokens += cost
+                    mock._contexts.append(body)
+                    done = {"done": True, "prompt_eval_count": cost,
+                            "context": [len(mock._contexts) - 1]}
+                words = mock._reply_words(body, mock._length(prompt, num_predict))
+                done["eval_count"] = len(words)
+                time.sleep(mock.latency)
+                if not payload.get("stream", True):
+                    time.sleep(len(words) / mock.token_rate if mock.token_rate else 0)
+                    with mock._lock:
+                        mock.tokens_sent += len(words)
+                    return self._json(200, {"response": " ".join(words), **done})
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for i, w in enumerate(words):
+                        if mock.token_rate:
+                            time.sleep(1 / mock.token_rate)
+                        self._chunk({"response": w + " ", "done": False})
+                        with mock._lock:
+                            mock.tokens_sent += 1
+                    self._chunk({"response": "", **done})
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass   # client cut the generation off
+                self.close_connection = True
+
+            def _chunk(self, obj):
+                data = (json.dumps(obj) + "\n").encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11434)
+    ap.add_argument("--latency", type=float, default=0.0)
+    ap.add_argument("--token-rate", type=float, default=0.0)
+    ap.add_argument("--mode", choices=["fit", "over", "under", "cycle"], default="fit")
+    args = ap.parse_args()
+    mock = MockOllama(args.host, args.port, args.latency, args.token_rate, args.mode)
+    print(f"mock Ollama on {mock.url} (mode={args.mode})")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
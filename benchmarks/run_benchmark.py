@@ -0,0 +1,206 @@
+"""End-to-end throughput benchmark against the local Ollama stand-in.
+
+Builds synthetic corpora of increasing size from the sample articles, runs
+each pipeline stage over them and reports per-stage latency percentiles,
+articles/sec and peak RSS. Use --save-baseline to record the numbers and
+--compare to flag regressions against them.
+
+    python -m benchmarks.run_benchmark --sizes 10 50 200 --mode cycle
+"""
+import argparse, json, os, random, resource, shutil, sys, tempfile, time
+from contextlib import ExitStack
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.mock_ollama import MockOllama
+
+BASELINE_FILE = ROOT / "benchmarks" / "baseline.json"
+STAGES = ["summarize", "evaluate", "risk", "api_summarize", "api_batch"]
+
+
+def synthetic_corpus(n, seed=0):
+    """n distinct health articles made by resampling sentences of the samples."""
+    rng = random.Random(seed)
+    sents = []
+    for fp in sorted((ROOT / "data" / "raw_articles").glob("*.txt")):
+        sents += [s.strip() + "." for s in fp.read_text(encoding="utf-8").split(".") if s.strip()]
+    corpus = []
+    for i in range(n):
+        k = rng.randint(8, min(40, len(sents)))
+        body = " ".join(rng.sample(sents, k))
+        corpus.append({"id": f"synthetic_{i:05d}", "text": f"Report {i}. {body}"})
+    return corpus
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    xs = sorted(samples)
+
+    def pct(p):
+        return xs[min(len(xs) - 1, int(round(p / 100 * (len(xs) - 1))))]
+
+    return {
+        "n": len(xs),
+        "p50_ms": round(pct(50) * 1000, 2),
+        "p95_ms": round(pct(95) * 1000, 2),
+        "p99_ms": round(pct(99) * 1000, 2),
+        "mean_ms": round(sum(xs) / len(xs) * 1000, 2),
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _timed(fn, *args, **kwargs):
+    t = time.perf_counter()
+    out = fn(*args, **kwargs)
+    return out, time.perf_counter() - t
+
+
+def run_size(corpus, stages):
+    import summarizer, evaluator, risk
+
+    res, lat, summaries = {}, {s: [] for s in stages}, []
+    t0 = time.perf_counter()
+    for art in corpus:
+        summ, dt = _timed(lambda t: summarizer.summarize(t, use_cache=False), art["text"])
+        lat["summarize"].append(dt)
+        summaries.append(summ)
+    res["summarize"] = {**percentiles(lat["summarize"]),
+                        "articles_per_s": round(len(corpus) / (time.perf_counter() - t0), 2)}
+
+    if "evaluate" in stages or "risk" in stages:
+        evals = []
+        t0 = time.perf_counter()
+        for art, summ in zip(corpus, summaries):
+            evl, dt = _timed(evaluator.evaluate, art["text"], summ["summary"])
+            lat["evaluate"].append(dt)
+            evals.append(evl)
+        res["evaluate"] = {**percentiles(lat["evaluate"]),
+                           "articles_per_s": round(len(corpus) / (time.perf_counter() - t0), 2)}
+        if "risk" in stages:
+            for summ, evl in zip(summaries, evals):
+                _, dt = _timed(risk.compute_risk, evl, summ["word_count"],
+                               summ["target_min"], summ["target_max"])
+                lat["risk"].append(dt)
+            res["risk"] = percentiles(lat["risk"])
+
+    if "api_summarize" in stages or "api_batch" in stages:
+        res.update(run_endpoints(corpus, stages))
+    return res
+
+
+def run_endpoints(corpus, stages):
+    """Drive the FastAPI app in-process from a scratch working directory."""
+    from fastapi.testclient import TestClient
+
+    out = {}
+    work = Path(tempfile.mkdtemp(prefix="heal-bench-"))
+    cwd = os.getcwd()
+    try:
+        os.chdir(work)
+        raw = work / "data" / "raw_articles"
+        raw.mkdir(parents=True)
+        for art in corpus:
+            (raw / f"{art['id']}.txt").write_text(art["text"], encoding="utf-8")
+
+        sys.modules.pop("app", None)
+        import app
+        # entering the client runs the lifespan, so the pooled async client
+        # lives on one event loop and is closed at the end
+        with TestClient(app.app) as client:
+            out.update(_drive(client, corpus, stages))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work, ignore_errors=True)
+    return out
+
+
+def _drive(client, corpus, stages):
+    out = {}
+    if "api_summarize" in stages:
+        lat = []
+        t0 = time.perf_counter()
+        for art in corpus:
+            r, dt = _timed(client.post, "/api/summarize", json={"text": art["text"], "refresh": True})
+            r.raise_for_status()
+            lat.append(dt)
+        out["api_summarize"] = {**percentiles(lat),
+                                "articles_per_s": round(len(corpus) / (time.perf_counter() - t0), 2)}
+    if "api_batch" in stages:
+        r, dt = _timed(client.post, "/api/batch?refresh=true")
+        r.raise_for_status()
+        out["api_batch"] = {"total_s": round(dt, 3),
+                            "articles_per_s": round(len(corpus) / dt, 2)}
+    return out
+
+
+def compare(current, baseline, tolerance):
+    """Print throughput deltas; return True if any stage regressed beyond tolerance."""
+    regressed = False
+    for size, stages in current["sizes"].items():
+        for stage, m in stages.items():
+            old = baseline.get("sizes", {}).get(size, {}).get(stage, {})
+            if "articles_per_s" not in m or not old.get("articles_per_s"):
+                continue
+            delta = (m["articles_per_s"] - old["articles_per_s"]) / old["articles_per_s"]
+            flag = "REGRESSION" if delta < -tolerance else ""
+            regressed |= bool(flag)
+            print(f"  n={size:>6} {stage:<14} {old['articles_per_s']:>9.2f} -> "
+                  f"{m['articles_per_s']:>9.2f} art/s ({delta:+.1%}) {flag}")
+    return regressed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="HEAL-Summ-Lite throughput benchmark")
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    ap.add_argument("--mode", choices=["fit", "over", "under", "cycle"], default="cycle")
+    ap.add_argument("--latency", type=float, default=0.0, help="mock time to first token (s)")
+    ap.add_argument("--token-rate", type=float, default=0.0, help="mock tokens/s, 0 = instant")
+    ap.add_argument("--backends", type=int, default=1, help="mock Ollama servers to balance over")
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--compare", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="allowed throughput drop")
+    ap.add_argument("--output", help="also write the report JSON here")
+    args = ap.parse_args()
+
+    stages = ["summarize"] + [s for s in args.stages if s != "summarize"]
+    report = {"mode": args.mode, "latency": args.latency, "token_rate": args.token_rate,
+              "backends": args.backends, "sizes": {}}
+    with ExitStack() as stack:
+        mocks = [
+            stack.enter_context(MockOllama(latency=args.latency, token_rate=args.token_rate, mode=args.mode))
+            for _ in range(args.backends)
+        ]
+        import summarizer
+        summarizer.OLLAMA_BACKENDS = [m.url for m in mocks]
+        for n in args.sizes:
+            print(f"n={n} ...", flush=True)
+            report["sizes"][str(n)] = run_size(synthetic_corpus(n), stages)
+        # prompt tokens the servers had to evaluate, across every stage and size
+        report["prompt_tokens"] = sum(m.prompt_tokens for m in mocks)
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    failed = False
+    if args.compare and BASELINE_FILE.exists():
+        print("vs baseline:")
+        failed = compare(report, json.loads(BASELINE_FILE.read_text()), args.tolerance)
+    if args.save_baseline:
+        BASELINE_FILE.write_text(json.dumps(report, indent=2))
+        print(f"baseline saved to {BASELINE_FILE}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import hashlib, json, os, tempfile, time
+from pathlib import Path
+
+from config import (
+    SUMMARY_CACHE_DIR, SUMMARY_CACHE_MAX_ENTRIES, SUMMARY_CACHE_MAX_AGE_DAYS,
+)
+
+# how many writes between full eviction sweeps
+_PRUNE_EVERY = 50
+
+
+def cache_key(article_text, model, system_prompt, bounds, options):
+    """Content address for one generation: same inputs, same summary."""
+    blob = json.dumps(
+        {
+            "text": article_text,
+            "model": model,
+            "system": system_prompt,
+            "bounds": list(bounds),
+            "options": options,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """On-disk summary records, one JSON file per key, evicted by age and count."""
+
+    def __init__(self, directory=SUMMARY_CACHE_DIR,
+                 max_entries=SUMMARY_CACHE_MAX_ENTRIES,
+                 max_age_days=SUMMARY_CACHE_MAX_AGE_DAYS):
+        self.dir = Path(directory)
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self._writes = 0
+
+    def _path(self, key):
+        return self.dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        fp = self._path(key)
+        try:
+            if time.time() - fp.stat().st_mtime > self.max_age:
+                fp.unlink(missing_ok=True)
+                return None
+            with open(fp) as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def put(self, key, record):
+        fp = self._path(key)
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=fp.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp, fp)
+
+        self._writes += 1
+        if self._writes % _PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop expired entries, then the oldest ones beyond max_entries."""
+        if not self.dir.exists():
+            return
+        now = time.time()
+        live = []
+        for fp in self.dir.glob("*/*.json"):
+            try:
+                mtime = fp.stat().st_mtime
+            except OSError:
+                continue
+            if now - mtime > self.max_age:
+                fp.unlink(missing_ok=True)
+            else:
+                live.append((mtime, fp))
+        live.sort()
+        for _, fp in live[:max(0, len(live) - self.max_entries)]:
+            fp.unlink(missing_ok=True)
+
+    def clear(self):
+        for fp in self.dir.glob("*/*.json"):
+            fp.unlink(missing_ok=True)
@@ -1,5 +1,26 @@
 OLLAMA_MODEL = "gemma3:4b"
 OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_TIMEOUT = 120          # seconds per generation
+OLLAMA_MAX_CONNECTIONS = 8    # pooled async connections
+
+# several Ollama servers to spread generations over (empty = just
+# OLLAMA_BASE_URL); each takes the least-loaded request first
+OLLAMA_BACKENDS = []
+OLLAMA_BACKEND_CONCURRENCY = 4    # generations in flight per backend
+# a backend that errors is ejected for this long, doubling per consecutive
+# failure, then gets a single trial request before rejoining
+OLLAMA_EJECT_SECONDS = 5
+OLLAMA_EJECT_MAX_SECONDS = 120
+
+# load NER models and the LLM in the background when the server starts
+WARM_UP_ON_STARTUP = True
+# a component whose warm-up failed is re-probed by /api/ready at most this often
+WARM_UP_RETRY_SECONDS = 30
+OLLAMA_KEEP_ALIVE = "30m"
+
+# async fan-out for /api/batch and the evaluation worker pool
+BATCH_CONCURRENCY = 4
+EVAL_WORKERS = 2
 
 SUMMARY_RATIO_LOW = 0.30  
 SUMMARY_RATIO_HIGH = 0.50  
@@ -7,16 +28,75 @@ SUMMARY_FLOOR = 25
 SUMMARY_CEILING = 200      
 MAX_RETRIES = 2
 
+# each attempt asks for this many summaries in parallel and the best one
+# (closest to the window, fewest dropped numbers) is kept across attempts
+SUMMARY_CANDIDATES = 1
+# no further attempts for an article once its generations have used this
+# many tokens or seconds in total (None = no limit)
+RETRY_TOKEN_BUDGET = None
+RETRY_TIME_BUDGET = None
+
+# sampling options sent with every generation; num_predict is derived
+# from the target range as hi * TOKENS_PER_WORD + NUM_PREDICT_MARGIN
+GENERATION_OPTIONS = {"temperature": 0.3}
+TOKENS_PER_WORD = 1.4
+NUM_PREDICT_MARGIN = 40
+
+# streamed attempts are abandoned once they pass hi + this many words
+STREAM_CUTOFF_SLACK = 5
+
+# articles longer than this are summarised in sentence-aligned chunks of
+# ~CHUNK_WORDS (map), then the chunk summaries are combined (reduce)
+CHUNK_THRESHOLD_WORDS = 1500
+CHUNK_WORDS = 800
+CHUNK_SUMMARY_WORDS = 120
+CHUNK_CONCURRENCY = 4
+
+# on-disk cache of finished summaries (set ENABLED to False to bypass)
+SUMMARY_CACHE_ENABLED = True
+SUMMARY_CACHE_DIR = "data/cache/summaries"
+SUMMARY_CACHE_MAX_ENTRIES = 5000
+SUMMARY_CACHE_MAX_AGE_DAYS = 30
+
 # minimum input length 
 MIN_INPUT_WORDS = 30
 
 SPACY_MODEL = "en_core_web_sm"
 SCISPACY_MODEL = "en_core_sci_sm"  
+# only NER is used; skip the rest of the pipeline
+SPACY_DISABLE = ["parser", "lemmatizer"]
 KEY_NER_LABELS = {
     "ORG", "GPE", "PERSON", "DATE",
     "PERCENT", "MONEY", "QUANTITY",
 }
 
+# parsed-entity cache (entries, keyed by text hash)
+ENTITY_CACHE_SIZE = 256
+
+# nlp.pipe settings for batch evaluation (-1 = one process per core)
+NLP_BATCH_SIZE = 64
+NLP_N_PROCESS = -1
+
+# entity phrases are matched as whole tokens against an index of the
+# other text's n-grams up to this length (longer ones walk token positions);
+# stemming lets "vaccines" match "vaccine"
+ENTITY_NGRAM_MAX = 6
+ENTITY_MATCH_STEM = False
+
+# memoised Porter stems for ROUGE tokenisation
+ROUGE_STEM_CACHE_SIZE = 50000
+
+# memoised per-word syllable counts for readability scoring
+SYLLABLE_CACHE_SIZE = 50000
+
+# Detoxify toxicity check on summaries (skipped if detoxify isn't installed)
+TOXICITY_ENABLED = True
+TOXICITY_MODEL = "original"
+TOXICITY_THRESHOLD = 0.5
+TOXICITY_BATCH_SIZE = 16
+TOXICITY_THREADS = 2
+TOXICITY_CACHE_SIZE = 4096
+
 ENTITY_COVERAGE_THRESHOLD = 0.6    
 ESCALATION_COVERAGE_THRESHOLD = 0.5  
 FKGL_HARD_THRESHOLD = 10   
@@ -60,7 +140,18 @@ MIN_HEALTH_KEYWORD_HITS = 5
 RESULTS_DIR = "results"
 SUMMARIES_FILE = "results/summaries.json"
 EVALUATION_FILE = "results/evaluation.csv"
+RESULTS_DB = "results/results.db"
+EVALUATION_PARQUET_FILE = "results/evaluation.parquet"
+EXPORT_PARQUET = False   # also write Parquet after batch runs (needs pyarrow)
+SUMMARIES_JSONL_FILE = "results/summaries.jsonl"
+EXPORT_JSONL = False   # also write one summary record per line after batch runs
 RAW_ARTICLES_DIR = "data/raw_articles"
+PROCESSED_DIR = "data/processed"   # per-article source profiles, see profiles.py
+MMAP_THRESHOLD_BYTES = 1 << 20   # article files this large are read via mmap
+REFERENCE_DIR = "data/reference"   # optional gold summaries, <article_id>.txt
+MANIFEST_FILE = "results/manifest.json"
+JOBS_DIR = "results/jobs"   # background batch jobs and their checkpoints
+JOB_WORKERS = 2
 
 
 def summary_bounds(input_word_count):
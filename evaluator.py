@@ -1,70 +1,355 @@
-import spacy
-import textstat
-from rouge_score import rouge_scorer
+import hashlib, re, threading
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import repeat
 
+# spaCy, pyphen and rouge_score are imported where they are first used,
+# so importing this module (and the app) stays cheap
 from config import (
-    SPACY_MODEL, SCISPACY_MODEL,
+    SPACY_MODEL, SCISPACY_MODEL, SPACY_DISABLE,
     KEY_NER_LABELS, ENTITY_COVERAGE_THRESHOLD,
+    ENTITY_CACHE_SIZE, NLP_BATCH_SIZE, NLP_N_PROCESS, ROUGE_STEM_CACHE_SIZE,
+    SYLLABLE_CACHE_SIZE, ENTITY_NGRAM_MAX, ENTITY_MATCH_STEM,
+    TOXICITY_ENABLED, TOXICITY_MODEL, TOXICITY_THRESHOLD, TOXICITY_BATCH_SIZE,
+    TOXICITY_THREADS, TOXICITY_CACHE_SIZE,
 )
+from metrics import EVAL_SECONDS
 from utils import extract_numbers
 
 # lazy-loaded models
 _nlp = None
 _sci_nlp = None
+_detox = None
 
 
 def _get_nlp():
     global _nlp
     if _nlp is None:
-        _nlp = spacy.load(SPACY_MODEL)
+        import spacy
+        _nlp = spacy.load(SPACY_MODEL, disable=SPACY_DISABLE)
     return _nlp
 
 
 def _get_sci_nlp():
     global _sci_nlp
     if _sci_nlp is None:
+        import spacy
         try:
-            _sci_nlp = spacy.load(SCISPACY_MODEL)
+            _sci_nlp = spacy.load(SCISPACY_MODEL, disable=SPACY_DISABLE)
         except OSError:
             _sci_nlp = False
     return _sci_nlp
 
 
+def _get_detox():
+    global _detox
+    if _detox is None:
+        if not TOXICITY_ENABLED:
+            _detox = False
+            return _detox
+        try:
+            import torch
+            from detoxify import Detoxify
+            torch.set_num_threads(TOXICITY_THREADS)
+            _detox = Detoxify(TOXICITY_MODEL, device="cpu")
+        except (ImportError, OSError, RuntimeError):
+            _detox = False
+    return _detox
+
+
+def warm_up():
+    """Load every model and push a sentence through it, so no request pays for it."""
+    text = "The WHO reported 120 cases of influenza in Geneva in 2023."
+    _get_nlp()(text)
+    sci = _get_sci_nlp()
+    if sci:
+        sci(text)
+    readability_scores(text)
+    rouge_scores(text, text)
+    toxicity_scores([text])
+
+
+# textstat's tokenisation: sentences are runs up to .!?, and words are
+# whitespace-separated once punctuation is stripped
+_SENTENCE = re.compile(r"\b[^.!?]+[.!?]*")
+_PUNCT = re.compile(r"[^\w\s]")
+_syllables = None
+
+
+def _get_syllables():
+    """Per-word syllable counter, pyphen hyphenation points as textstat counts them, memoised."""
+    global _syllables
+    if _syllables is None:
+        import pyphen
+        hyph = pyphen.Pyphen(lang="en_US")
+        _syllables = lru_cache(maxsize=SYLLABLE_CACHE_SIZE)(lambda w: len(hyph.positions(w)) + 1)
+    return _syllables
+
+
+def _readability_counts(text):
+    """(sentences, words, syllables) from a single tokenisation of the text."""
+    words = _PUNCT.sub("", text).lower().split()
+    if not words:
+        return 0, 0, 0
+    long_sentences = sum(
+        1 for s in _SENTENCE.findall(text) if len(_PUNCT.sub("", s).split()) > 2
+    )
+    syll = _get_syllables()
+    return max(1, long_sentences), len(words), sum(syll(w) for w in words)
+
+
+def _round_half_away(x, points):
+    # textstat's rounding (half away from zero), not NumPy's half-to-even
+    import numpy as np
+    p = 10 ** points
+    return np.floor(x * p + np.copysign(0.5, x)) / p
+
+
+def readability_batch(texts):
+    """FKGL and FRE for many texts in one vectorised pass over their counts.
+
+    Like textstat, the two averages are rounded to one decimal before the
+    formulas are applied, and FKGL is reported to one decimal.
+    """
+    import numpy as np
+    counts = np.array([_readability_counts(t) for t in texts], dtype=float).reshape(-1, 3)
+    sents, words, sylls = counts.T
+    has_words = words > 0
+    wps = _round_half_away(np.divide(words, sents, out=np.zeros_like(words), where=has_words), 1)
+    spw = _round_half_away(np.divide(sylls, words, out=np.zeros_like(words), where=has_words), 1)
+    fkgl = _round_half_away(np.where(has_words, 0.39 * wps + 11.8 * spw - 15.59, 0.0), 1)
+    fre = _round_half_away(np.where(has_words, 206.835 - 1.015 * wps - 84.6 * spw, 0.0), 2)
+    return [{"fkgl": float(g), "fre": float(e)} for g, e in zip(fkgl, fre)]
+
 
 def readability_scores(text):
-    return {
-        "fkgl": round(textstat.flesch_kincaid_grade(text), 2),
-        "fre": round(textstat.flesch_reading_ease(text), 2),
-    }
+    return readability_batch([text])[0]
 
 
+# parsed entities keyed by content hash, so a source article seen again
+# (retries, re-scoring, threshold sweeps) skips the spaCy pass; the lock
+# only guards the cache, parsing itself runs outside it
+_ent_cache = OrderedDict()
+_ent_lock = threading.Lock()
 
-def extract_entities(text):
-    nlp = _get_nlp()
-    doc = nlp(text)
+
+def _text_key(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _doc_entities(doc, sci_doc=None):
     ents = [
         {"text": ent.text, "label": ent.label_}
         for ent in doc.ents if ent.label_ in KEY_NER_LABELS
     ]
-    sci = _get_sci_nlp()
-    if sci and sci is not False:
-        for ent in sci(text).ents:
+    if sci_doc is not None:
+        for ent in sci_doc.ents:
             ents.append({"text": ent.text, "label": "DISEASE/ENTITY"})
     return ents
 
 
+def _parse_entities(text):
+    sci = _get_sci_nlp()
+    return _doc_entities(_get_nlp()(text), sci(text) if sci else None)
+
+
+def _recall(keys):
+    with _ent_lock:
+        hits = {k: _ent_cache[k] for k in keys if k in _ent_cache}
+        for k in hits:
+            _ent_cache.move_to_end(k)
+    return hits
+
+
+def _remember(key, ents):
+    with _ent_lock:
+        _ent_cache[key] = ents
+        if len(_ent_cache) > ENTITY_CACHE_SIZE:
+            _ent_cache.popitem(last=False)
+
+
+def extract_entities(text):
+    key = _text_key(text)
+    ents = _recall([key]).get(key)
+    if ents is None:
+        ents = _parse_entities(text)
+        _remember(key, ents)
+    return [dict(e) for e in ents]
+
+
+def extract_entities_batch(texts, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS):
+    """Entities for many texts at once, streaming the uncached ones through nlp.pipe."""
+    keys = [_text_key(t) for t in texts]
+    parsed = _recall(keys)
+    todo = {}
+    for k, t in zip(keys, texts):
+        if k not in parsed:
+            todo.setdefault(k, t)
+
+    if todo:
+        todo_keys, todo_texts = list(todo), list(todo.values())
+        # worker start-up costs more than it saves on small batches
+        procs = n_process if len(todo_texts) > batch_size else 1
+        docs = _get_nlp().pipe(todo_texts, batch_size=batch_size, n_process=procs)
+        sci = _get_sci_nlp()
+        sci_docs = (
+            sci.pipe(todo_texts, batch_size=batch_size, n_process=procs)
+            if sci else repeat(None)
+        )
+        for k, doc, sci_doc in zip(todo_keys, docs, sci_docs):
+            parsed[k] = _doc_entities(doc, sci_doc)
+            _remember(k, parsed[k])
+
+    return [[dict(e) for e in parsed[k]] for k in keys]
+
+
 def _ent_texts(ents):
     return {e["text"].lower().strip() for e in ents}
 
 
+# symbols are tokens of their own, so "50%" or "$5" never match a bare "50"/"5"
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_stem = None
+
+
+def _tokens(text):
+    global _stem
+    toks = _TOKEN.findall(text.lower())
+    if not ENTITY_MATCH_STEM:
+        return toks
+    if _stem is None:
+        _stem = _MemoStemmer().stem
+    return [_stem(t) for t in toks]
+
 
-def entity_coverage(original, summary):
-    orig = _ent_texts(extract_entities(original))
+class _TokenIndex:
+    """Whole-token phrase lookup for one text, built once.
+
+    Every n-gram up to ENTITY_NGRAM_MAX tokens goes into a hash set, so a
+    phrase lookup costs its own length rather than a scan of the text, and
+    "who" no longer matches inside "whole".
+    """
+
+    def __init__(self, text):
+        self.toks = _tokens(text)
+        self.lower = text.lower()
+        n = len(self.toks)
+        self.grams = {
+            tuple(self.toks[i:i + k])
+            for k in range(1, ENTITY_NGRAM_MAX + 1)
+            for i in range(n - k + 1)
+        }
+        self._starts = None
+
+    def __contains__(self, phrase):
+        toks = tuple(_tokens(phrase))
+        if not toks:
+            return phrase in self.lower   # blank phrase: nothing to tokenise
+        if len(toks) <= ENTITY_NGRAM_MAX:
+            return toks in self.grams
+        if toks[:ENTITY_NGRAM_MAX] not in self.grams:
+            return False
+        if self._starts is None:
+            self._starts = {}
+            for i, t in enumerate(self.toks):
+                self._starts.setdefault(t, []).append(i)
+        k = len(toks)
+        return any(tuple(self.toks[i:i + k]) == toks for i in self._starts[toks[0]])
+
+
+# toxicity scores keyed by summary hash; the model is serialised behind one
+# lock since torch already spreads a forward pass over TOXICITY_THREADS
+_tox_cache = OrderedDict()
+_tox_lock = threading.Lock()
+
+
+def toxicity_scores(summaries):
+    """Detoxify toxicity score per summary, scored in batches; None if the model is unavailable."""
+    if not summaries:
+        return []   # e.g. an incremental run with nothing to do: don't load the model
+    model = _get_detox()
+    if not model:
+        return [None] * len(summaries)
+
+    keys = [_text_key(t) for t in summaries]
+    with _tox_lock:
+        scores = {k: _tox_cache[k] for k in keys if k in _tox_cache}
+        todo = {}
+        for k, t in zip(keys, summaries):
+            if k not in scores:
+                todo.setdefault(k, t)
+        todo = list(todo.items())
+        for i in range(0, len(todo), TOXICITY_BATCH_SIZE):
+            batch = todo[i:i + TOXICITY_BATCH_SIZE]
+            out = model.predict([t for _, t in batch])
+            for (k, _), score in zip(batch, out["toxicity"]):
+                scores[k] = _tox_cache[k] = round(float(score), 4)
+                if len(_tox_cache) > TOXICITY_CACHE_SIZE:
+                    _tox_cache.popitem(last=False)
+    return [scores[k] for k in keys]
+
+
+_UNSCORED = object()
+
+
+class EvalContext:
+    """One (original, summary) pair, parsed at most once and shared by every check."""
+
+    def __init__(self, original, summary, orig_ents=None, summ_ents=None, toxicity=_UNSCORED,
+                 readability=None):
+        self.original = original
+        self.summary = summary
+        self._orig_ents = None if orig_ents is None else _ent_texts(orig_ents)
+        self._summ_ents = None if summ_ents is None else _ent_texts(summ_ents)
+        self._toxicity = toxicity
+        self._readability = readability
+        self._orig_index = None
+        self._summ_index = None
+
+    @property
+    def readability(self):
+        if self._readability is None:
+            self._readability = readability_scores(self.summary)
+        return self._readability
+
+    @property
+    def toxicity(self):
+        if self._toxicity is _UNSCORED:
+            self._toxicity = toxicity_scores([self.summary])[0]
+        return self._toxicity
+
+    @property
+    def orig_ents(self):
+        if self._orig_ents is None:
+            self._orig_ents = _ent_texts(extract_entities(self.original))
+        return self._orig_ents
+
+    @property
+    def summ_ents(self):
+        if self._summ_ents is None:
+            self._summ_ents = _ent_texts(extract_entities(self.summary))
+        return self._summ_ents
+
+    @property
+    def orig_index(self):
+        if self._orig_index is None:
+            self._orig_index = _TokenIndex(self.original)
+        return self._orig_index
+
+    @property
+    def summ_index(self):
+        if self._summ_index is None:
+            self._summ_index = _TokenIndex(self.summary)
+        return self._summ_index
+
+
+def entity_coverage(original, summary, ctx=None):
+    ctx = ctx or EvalContext(original, summary)
+    orig = ctx.orig_ents
     if not orig:
         return 1.0  # nothing to miss
-    summ = _ent_texts(extract_entities(summary))
-    summary_lower = summary.lower()
-    matched = sum(1 for e in orig if e in summ or e in summary_lower)
+    summ = ctx.summ_ents
+    matched = sum(1 for e in orig if e in summ or e in ctx.summ_index)
     return round(matched / len(orig), 4)
 
 
@@ -72,11 +357,11 @@ def entity_coverage_flag(cov):
     return cov < ENTITY_COVERAGE_THRESHOLD
 
 
-def hallucination_check(original, summary):
-    orig = _ent_texts(extract_entities(original))
-    summ = _ent_texts(extract_entities(summary))
-    original_lower = original.lower()
-    extra = {e for e in summ if e not in orig and e not in original_lower}
+def hallucination_check(original, summary, ctx=None):
+    ctx = ctx or EvalContext(original, summary)
+    orig = ctx.orig_ents
+    summ = ctx.summ_ents
+    extra = {e for e in summ if e not in orig and e not in ctx.orig_index}
     return {
         "extra_entities": sorted(extra),
         "count": len(extra),
@@ -84,8 +369,8 @@ def hallucination_check(original, summary):
     }
 
 
-def numeric_consistency(original, summary):
-    orig_nums = extract_numbers(original)
+def numeric_consistency(original, summary, orig_nums=None):
+    orig_nums = extract_numbers(original) if orig_nums is None else set(orig_nums)
     summ_nums = extract_numbers(summary)
     missing = orig_nums - summ_nums
     return {
@@ -95,25 +380,82 @@ def numeric_consistency(original, summary):
         "has_missing": len(missing) > 0,
     }
 
-def rouge_scores(summary, reference=None):
-    if not reference:
-        return None
-    scorer = rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True)
-    s = scorer.score(reference, summary)
-    return {
-        "rouge1_f": round(s["rouge1"].fmeasure, 4),
-        "rougeL_f": round(s["rougeL"].fmeasure, 4),
-    }
+class _MemoStemmer:
+    """Porter stemmer with a memo table; summaries repeat most of their words."""
+
+    def __init__(self):
+        from nltk.stem import porter
+        self.stem = lru_cache(maxsize=ROUGE_STEM_CACHE_SIZE)(porter.PorterStemmer().stem)
+
+
+class _RougeTokenizer:
+    # same tokenisation as rouge_score's DefaultTokenizer(use_stemmer=True)
+    def __init__(self):
+        from rouge_score import tokenize
+        self._tokenize = tokenize.tokenize
+        self._stemmer = _MemoStemmer()
+
+    def tokenize(self, text):
+        return self._tokenize(text, self._stemmer)
+
+
+_rouge_tok = None
 
 
+def _get_rouge_tokenizer():
+    global _rouge_tok
+    if _rouge_tok is None:
+        _rouge_tok = _RougeTokenizer()
+    return _rouge_tok
 
 
-def evaluate(original, summary, reference=None):
-    rd = readability_scores(summary)
-    cov = entity_coverage(original, summary)
-    hall = hallucination_check(original, summary)
-    nums = numeric_consistency(original, summary)
-    rouge = rouge_scores(summary, reference)
+def rouge_batch(pairs):
+    """ROUGE-1/L F1 for many (summary, reference) pairs; None where there is no reference.
+
+    Same numbers as RougeScorer(["rouge1", "rougeL"], use_stemmer=True), but
+    each distinct reference is tokenised and counted once, however many
+    summaries are scored against it (e.g. candidates over one gold set).
+    """
+    from rouge_score import rouge_scorer
+    tok = _get_rouge_tokenizer()
+    refs = {}   # reference text -> (tokens, unigram counts)
+    out = []
+    for summary, reference in pairs:
+        if not reference:
+            out.append(None)
+            continue
+        if reference not in refs:
+            toks = tok.tokenize(reference)
+            refs[reference] = toks, rouge_scorer._create_ngrams(toks, 1)
+        ref_toks, ref_grams = refs[reference]
+        summ_toks = tok.tokenize(summary)
+        r1 = rouge_scorer._score_ngrams(ref_grams, rouge_scorer._create_ngrams(summ_toks, 1))
+        rl = rouge_scorer._score_lcs(ref_toks, summ_toks)
+        out.append({"rouge1_f": round(r1.fmeasure, 4), "rougeL_f": round(rl.fmeasure, 4)})
+    return out
+
+
+def rouge_scores(summary, reference=None):
+    return rouge_batch([(summary, reference)])[0]
+
+
+def evaluate(original, summary, reference=None, ctx=None, profile=None):
+    """Run every check; `profile` (see profiles.py) supplies the source-side entities and numbers."""
+    ctx = ctx or EvalContext(original, summary, profile and profile["entities"])
+    t = {}
+    with EVAL_SECONDS.time(t, "readability", check="readability"):
+        rd = ctx.readability
+    # NER for both texts happens here on first access to the context
+    with EVAL_SECONDS.time(t, "entity_coverage", check="entity_coverage"):
+        cov = entity_coverage(original, summary, ctx)
+    with EVAL_SECONDS.time(t, "hallucination", check="hallucination"):
+        hall = hallucination_check(original, summary, ctx)
+    with EVAL_SECONDS.time(t, "numeric", check="numeric"):
+        nums = numeric_consistency(original, summary, profile and profile["numbers"])
+    with EVAL_SECONDS.time(t, "rouge", check="rouge"):
+        rouge = rouge_scores(summary, reference)
+    with EVAL_SECONDS.time(t, "toxicity", check="toxicity"):
+        tox = ctx.toxicity
 
     return {
         **rd,
@@ -125,4 +467,32 @@ def evaluate(original, summary, reference=None):
         "numeric": nums,
         "missing_numbers": nums["has_missing"],
         "rouge": rouge,
+        "toxicity": tox,
+        "toxicity_flag": tox is not None and tox >= TOXICITY_THRESHOLD,
+        "timings": t,
     }
+
+
+def evaluate_batch(pairs, references=None, batch_size=NLP_BATCH_SIZE, n_process=NLP_N_PROCESS,
+                   profiles=None):
+    """Evaluate many (original, summary) pairs; returns the same dicts as evaluate()."""
+    pairs = list(pairs)
+    references = references or [None] * len(pairs)
+    profiles = profiles or [None] * len(pairs)
+    known = [p and p["entities"] for p in profiles]
+    # only originals without profiled entities go through spaCy
+    texts = [
+        t for (original, summary), ents in zip(pairs, known)
+        for t in ((summary,) if ents is not None else (original, summary))
+    ]
+    parsed = iter(extract_entities_batch(texts, batch_size=batch_size, n_process=n_process))
+    summaries = [summary for _, summary in pairs]
+    tox = toxicity_scores(summaries)
+    rd = readability_batch(summaries)
+
+    results = []
+    for i, ((original, summary), ref, prof) in enumerate(zip(pairs, references, profiles)):
+        orig_ents = known[i] if known[i] is not None else next(parsed)
+        ctx = EvalContext(original, summary, orig_ents, next(parsed), tox[i], rd[i])
+        results.append(evaluate(original, summary, ref, ctx, prof))
+    return results
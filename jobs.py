@@ -0,0 +1,226 @@
+import json, os, tempfile, threading, time, uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+
+from config import JOBS_DIR, JOB_WORKERS, RAW_ARTICLES_DIR
+from utils import iter_articles
+
+ACTIVE = ("queued", "running")   # terminal: "done", "cancelled", "failed"
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class _Job:
+    def __init__(self, path, state):
+        self.path = path
+        self.state = state
+        self.cancelled = threading.Event()
+        self.lock = threading.Lock()
+
+    def save(self):
+        self.state["updated_at"] = _now()
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path / "job.json")
+
+    def checkpoint(self, entry):
+        """Append one finished article; fsync so a crash never loses it."""
+        with open(self.path / "checkpoint.jsonl", "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def finished(self):
+        fp = self.path / "checkpoint.jsonl"
+        if not fp.exists():
+            return []
+        out = []
+        with open(fp) as f:
+            for line in f:
+                try:
+                    out.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break   # torn last line from a crash; that article is redone
+        return out
+
+
+class JobManager:
+    """Batch runs as background jobs, checkpointed per article under JOBS_DIR.
+
+    `process(article, refresh)` turns {"id", "text"} into a record (or None
+    to skip it). Each finished article is appended to the job's checkpoint
+    before it counts as done, so a restarted server resumes where it left off.
+    """
+
+    def __init__(self, process, on_record=None, on_finish=None,
+                 directory=JOBS_DIR, articles_dir=RAW_ARTICLES_DIR, workers=JOB_WORKERS):
+        self.process = process
+        self.on_record = on_record
+        self.on_finish = on_finish
+        self.dir = Path(directory)
+        self.articles_dir = Path(articles_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="job")
+        self._window = workers * 2   # articles read ahead of the workers
+        self._jobs = {}
+        self._stop = threading.Event()
+
+    def submit(self, refresh=False):
+        # .txt files and JSONL corpora alike, in the order a run reads them
+        ids = [art["id"] for art in iter_articles(self.articles_dir)]
+        if not ids:
+            return None
+        # creation time first, so ids sort in submission order
+        job_id = f"{time.time_ns():016x}{uuid.uuid4().hex[:4]}"
+        path = self.dir / job_id
+        path.mkdir()
+        job = _Job(path, {
+            "id": job_id, "status": "queued", "created_at": _now(), "refresh": refresh,
+            "articles": ids, "total": len(ids), "done": 0, "skipped": 0, "errors": [],
+        })
+        job.save()
+        self._start(job)
+        return job_id
+
+    def _start(self, job):
+        self._jobs[job.state["id"]] = job
+        threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def resume(self):
+        """Restart every job a previous process left queued or running."""
+        for fp in sorted(self.dir.glob("*/job.json")):
+            state = json.loads(fp.read_text())
+            if state["status"] in ACTIVE and state["id"] not in self._jobs:
+                self._start(_Job(fp.parent, state))
+
+    def _load(self, job_id):
+        job = self._jobs.get(job_id)
+        if job:
+            return job
+        fp = self.dir / job_id / "job.json"
+        if not fp.is_file():
+            return None
+        return _Job(fp.parent, json.loads(fp.read_text()))
+
+    def get(self, job_id):
+        job = self._load(job_id)
+        if not job:
+            return None
+        state = {k: v for k, v in job.state.items() if k != "articles"}
+        return state
+
+    def list(self):
+        """Every job, newest first."""
+        jobs = [self.get(fp.parent.name) for fp in self.dir.glob("*/job.json")]
+        return sorted(jobs, key=lambda s: (s.get("created_at", ""), s["id"]), reverse=True)
+
+    def records(self, job_id):
+        job = self._load(job_id)
+        if not job:
+            return None
+        return [e["record"] for e in job.finished() if e.get("record")]
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job:
+            job.cancelled.set()
+            return True
+        job = self._load(job_id)
+        if job and job.state["status"] in ACTIVE:
+            job.state["status"] = "cancelled"
+            job.save()
+            return True
+        return False
+
+    def shutdown(self):
+        # jobs stay "running" on disk and are picked up by resume() next start
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _one(self, job, art):
+        if job.cancelled.is_set() or self._stop.is_set():
+            return None
+        try:
+            return {"id": art["id"], "record": self.process(art, job.state["refresh"])}
+        except Exception as exc:
+            return {"id": art["id"], "record": None, "error": f"{type(exc).__name__}: {exc}"}
+
+    def _finish(self, job, entry):
+        with job.lock:
+            job.checkpoint(entry)
+            if entry.get("error"):
+                job.state["errors"].append({"id": entry["id"], "error": entry["error"]})
+            elif entry["record"] is None:
+                job.state["skipped"] += 1
+            else:
+                job.state["done"] += 1
+                if self.on_record:
+                    self.on_record(entry["record"])
+            job.save()
+
+    def _drain(self, job, futures):
+        for fut in futures:
+            try:
+                entry = fut.result()
+            except Exception:   # cancelled by shutdown
+                entry = None
+            if entry is not None:
+                self._finish(job, entry)
+
+    def _run(self, job):
+        try:
+            self._work(job)
+        except Exception as exc:
+            # e.g. the finish hook could not write the exports; without this the
+            # thread dies and the job reads "running" forever
+            with job.lock:
+                job.state["errors"].append({"id": None, "error": f"{type(exc).__name__}: {exc}"})
+                job.state["status"] = "failed"
+                job.save()
+            self._jobs.pop(job.state["id"], None)
+
+    def _work(self, job):
+        finished = job.finished()
+        seen = {e["id"] for e in finished}
+        todo = {a for a in job.state["articles"] if a not in seen}
+        job.state.update(
+            status="running",
+            done=sum(1 for e in finished if e.get("record")),
+            skipped=sum(1 for e in finished if not e.get("record") and not e.get("error")),
+            errors=[{"id": e["id"], "error": e["error"]} for e in finished if e.get("error")],
+        )
+        job.save()
+
+        # texts are read lazily, a window ahead of the workers, so a large
+        # corpus never sits in memory all at once
+        pending = set()
+        for art in iter_articles(self.articles_dir):
+            if job.cancelled.is_set() or self._stop.is_set():
+                break
+            if art["id"] not in todo:
+                continue
+            todo.discard(art["id"])
+            pending.add(self._pool.submit(self._one, job, art))
+            if len(pending) >= self._window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                self._drain(job, done)
+        self._drain(job, pending)
+
+        if not (job.cancelled.is_set() or self._stop.is_set()):
+            # removed from the directory after the job was submitted
+            for aid in sorted(todo):
+                self._finish(job, {"id": aid, "record": None, "error": "Article no longer exists"})
+
+        if self._stop.is_set():
+            return
+        cancelled = job.cancelled.is_set()
+        # exports land before the job reports done, so a poller never sees stale files
+        if not cancelled and self.on_finish:
+            self.on_finish(self.records(job.state["id"]))
+        job.state["status"] = "cancelled" if cancelled else "done"
+        job.save()
+        self._jobs.pop(job.state["id"], None)
@@ -0,0 +1,113 @@
+import hashlib, json, os, tempfile
+from pathlib import Path
+
+import config
+from config import MANIFEST_FILE, RAW_ARTICLES_DIR
+from utils import JSONL_SUFFIXES, iter_jsonl
+
+_SUFFIXES = (".txt",) + JSONL_SUFFIXES
+
+# settings that change what a summary or its scores look like; editing any
+# of them invalidates every manifest entry
+_VERSIONED = (
+    "OLLAMA_MODEL", "SYSTEM_PROMPT", "GENERATION_OPTIONS", "MAX_RETRIES",
+    "SUMMARY_RATIO_LOW", "SUMMARY_RATIO_HIGH", "SUMMARY_FLOOR", "SUMMARY_CEILING",
+    "MIN_INPUT_WORDS", "HEALTH_KEYWORDS", "MIN_HEALTH_KEYWORD_HITS",
+    "SPACY_MODEL", "SCISPACY_MODEL", "KEY_NER_LABELS",
+    "ENTITY_COVERAGE_THRESHOLD", "ESCALATION_COVERAGE_THRESHOLD",
+    "FKGL_HARD_THRESHOLD", "FKGL_ESCALATION_THRESHOLD",
+    "TOXICITY_ENABLED", "TOXICITY_MODEL", "TOXICITY_THRESHOLD",
+)
+
+
+def config_version(names=_VERSIONED):
+    snapshot = {}
+    for name in names:
+        val = getattr(config, name)
+        snapshot[name] = sorted(val) if isinstance(val, (set, frozenset)) else val
+    blob = json.dumps(snapshot, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_manifest(path=MANIFEST_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"config_version": None, "files": {}}
+
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=Path(path).parent, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def article_hashes(entry):
+    """{article id: sha256} for one manifest file entry.
+
+    A .txt file holds one article, a JSONL corpus many; entries written
+    before corpora were tracked carry a single id/sha256 pair.
+    """
+    if "articles" in entry:
+        return entry["articles"]
+    return {entry["id"]: entry["sha256"]}
+
+
+def article_ids(manifest):
+    return {aid for entry in manifest.get("files", {}).values() for aid in article_hashes(entry)}
+
+
+def _read(path):
+    if path.suffix == ".txt":
+        text = path.read_text(encoding="utf-8").strip()
+        return [{"id": path.stem, "text": text}]
+    return list(iter_jsonl(path))
+
+
+def scan(directory=RAW_ARTICLES_DIR, manifest=None):
+    """Diff a directory against the manifest.
+
+    Files whose mtime and size are unchanged are trusted without being read;
+    the rest are hashed per article, so a touched-but-identical file (or an
+    appended-to JSONL corpus) only re-runs the articles that really changed.
+    Returns (changed articles, deleted article ids, updated manifest).
+    """
+    manifest = manifest if manifest is not None else load_manifest()
+    version = config_version()
+    stale = manifest.get("config_version") != version
+    old = manifest.get("files", {})
+    # by id rather than by file, so an article moved between files is not re-run
+    old_hashes = {aid: h for entry in old.values() for aid, h in article_hashes(entry).items()}
+
+    files, changed = {}, []
+    folder = Path(directory)
+    entries = sorted(os.scandir(folder), key=lambda e: e.name) if folder.exists() else []
+    for entry in entries:
+        path = Path(entry.path)
+        if not (entry.is_file() and path.suffix in _SUFFIXES):
+            continue
+        st = entry.stat()
+        prev = old.get(entry.path)
+        if (not stale and prev and prev["mtime"] == st.st_mtime_ns
+                and prev["size"] == st.st_size):
+            files[entry.path] = prev
+            continue
+
+        hashes = {}
+        for art in _read(path):
+            digest = content_hash(art["text"])
+            hashes[art["id"]] = digest
+            if stale or old_hashes.get(art["id"]) != digest:
+                changed.append(art)
+        files[entry.path] = {"mtime": st.st_mtime_ns, "size": st.st_size, "articles": hashes}
+
+    live = {aid for entry in files.values() for aid in article_hashes(entry)}
+    deleted = sorted(set(old_hashes) - live)
+    return changed, deleted, {"config_version": version, "files": files}
@@ -0,0 +1,108 @@
+"""Tiny in-process metrics registry rendered in Prometheus text format.
+
+Each observation is a dict lookup and an add under a lock, cheap enough to
+leave on in production.
+"""
+import threading, time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry = []
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, doc):
+        self.name, self.doc = name, doc
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(key)} {v}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, doc, buckets=DEFAULT_BUCKETS):
+        self.name, self.doc = name, doc
+        self.buckets = tuple(buckets)
+        self._series = {}   # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    @contextmanager
+    def time(self, timings=None, name=None, **labels):
+        """Observe the block's duration; also store it in `timings[name]` if given."""
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t
+            self.observe(dt, **labels)
+            if timings is not None:
+                timings[name] = round(timings.get(name, 0) + dt, 4)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, s in sorted(self._series.items()):
+                acc = 0
+                for le, n in zip(self.buckets, s):
+                    acc += n
+                    lines.append(f"{self.name}_bucket{_label_str(key + (('le', le),))} {acc}")
+                lines.append(f"{self.name}_bucket{_label_str(key + (('le', '+Inf'),))} {s[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(key)} {round(s[-2], 6)}")
+                lines.append(f"{self.name}_count{_label_str(key)} {s[-1]}")
+        return lines
+
+
+def render():
+    lines = []
+    for m in _registry:
+        lines += m.render()
+    return "\n".join(lines) + "\n"
+
+
+# pipeline metrics
+OLLAMA_SECONDS = Histogram("heal_ollama_request_seconds", "Ollama generate call latency.")
+OLLAMA_TOKENS = Counter("heal_ollama_tokens_total", "Tokens generated by Ollama.")
+OLLAMA_PROMPT_TOKENS = Counter("heal_ollama_prompt_tokens_total", "Prompt tokens Ollama had to evaluate.")
+OLLAMA_BACKEND_FAILURES = Counter("heal_ollama_backend_failures_total", "Ollama backend errors that led to an ejection.")
+OLLAMA_ABORTED = Counter("heal_ollama_aborted_total", "Generations cut off for overshooting the window.")
+SUMMARY_RETRIES = Counter("heal_summary_retries_total", "Extra generation attempts after the first.")
+SUMMARY_WASTED_TOKENS = Counter("heal_summary_wasted_tokens_total", "Tokens spent on candidates that were not returned.")
+SUMMARY_COALESCED = Counter("heal_summary_coalesced_total", "Summarise requests served by an identical one already in flight.")
+SUMMARY_CACHE = Counter("heal_summary_cache_total", "Summary cache lookups by result.")
+EVAL_SECONDS = Histogram("heal_eval_check_seconds", "Time per evaluation check.")
+RISK_SECONDS = Histogram("heal_risk_seconds", "compute_risk latency.", buckets=(1e-5, 1e-4, 1e-3, 0.01, 0.1))
+WRITE_SECONDS = Histogram("heal_write_seconds", "Result store and export write latency.")
+RECORDS = Counter("heal_records_total", "Records produced, by source.")
+CORPUS_BAD_LINES = Counter("heal_corpus_bad_lines_total", "Malformed JSONL corpus lines that were skipped.")
@@ -0,0 +1,118 @@
+"""Per-article source profiles, persisted in data/processed.
+
+Everything the pipeline derives from a source article alone (word count,
+target window, health gate, numbers, named entities) is computed once and
+stored as JSON keyed by the article's content hash. A profile written by an
+older pipeline or under different settings is ignored and rebuilt.
+
+Run `python profiles.py [directory]` to build profiles ahead of a batch.
+"""
+import json, os, sys, tempfile
+from itertools import islice
+from pathlib import Path
+
+from config import PROCESSED_DIR, RAW_ARTICLES_DIR, MIN_INPUT_WORDS, NLP_BATCH_SIZE, summary_bounds
+from evaluator import extract_entities_batch
+from manifest import config_version, content_hash
+from utils import count_words, extract_numbers, is_health_content, iter_articles
+
+# bump when a field is added or computed differently
+PIPELINE_VERSION = 1
+
+# settings the profile fields depend on
+_PROFILED = (
+    "SUMMARY_RATIO_LOW", "SUMMARY_RATIO_HIGH", "SUMMARY_FLOOR", "SUMMARY_CEILING",
+    "MIN_INPUT_WORDS", "HEALTH_KEYWORDS", "MIN_HEALTH_KEYWORD_HITS",
+    "SPACY_MODEL", "SCISPACY_MODEL", "KEY_NER_LABELS",
+)
+
+
+def profile_version():
+    return f"{PIPELINE_VERSION}-{config_version(_PROFILED)}"
+
+
+class ProfileStore:
+    """One JSON file per article content hash."""
+
+    def __init__(self, directory=PROCESSED_DIR):
+        self.dir = Path(directory)
+
+    def _path(self, digest):
+        return self.dir / digest[:2] / f"{digest}.json"
+
+    def get(self, digest):
+        try:
+            with open(self._path(digest)) as f:
+                profile = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        return profile if profile.get("version") == profile_version() else None
+
+    def put(self, profile):
+        fp = self._path(profile["sha256"])
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=fp.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(profile, f)
+        os.replace(tmp, fp)
+
+
+_store = ProfileStore()
+
+
+def _build(text, digest):
+    wc = count_words(text)
+    health = is_health_content(text)
+    return {
+        "version": profile_version(),
+        "sha256": digest,
+        "word_count": wc,
+        "bounds": list(summary_bounds(wc)),
+        "health": health,
+        "numbers": sorted(extract_numbers(text)),
+        # NER is skipped for articles the gates reject; they never get evaluated
+        "entities": [] if wc >= MIN_INPUT_WORDS and health else None,
+    }
+
+
+def profile_batch(texts, store=None):
+    """Profiles for many articles; missing ones are built (NER batched) and saved."""
+    store = store or _store
+    digests = [content_hash(t) for t in texts]
+    found, todo = {}, {}
+    for d, t in zip(digests, texts):
+        if d in found or d in todo:
+            continue
+        profile = store.get(d)
+        if profile is None:
+            todo[d] = (t, _build(t, d))
+        else:
+            found[d] = profile
+
+    parse = [(t, p) for t, p in todo.values() if p["entities"] is not None]
+    for (_, p), ents in zip(parse, extract_entities_batch([t for t, _ in parse])):
+        p["entities"] = ents
+    for d, (_, p) in todo.items():
+        store.put(p)
+        found[d] = p
+    return [found[d] for d in digests]
+
+
+def get_profile(text, store=None):
+    return profile_batch([text], store)[0]
+
+
+def preprocess(directory=RAW_ARTICLES_DIR, store=None):
+    """Profile every article in a directory; returns how many were seen."""
+    articles, n = iter_articles(directory), 0
+    while True:
+        batch = [a["text"] for a in islice(articles, NLP_BATCH_SIZE)]
+        if not batch:
+            return n
+        profile_batch(batch, store)
+        n += len(batch)
+
+
+if __name__ == "__main__":
+    folder = sys.argv[1] if len(sys.argv) > 1 else RAW_ARTICLES_DIR
+    print(f"profiled {preprocess(folder)} article(s) into {PROCESSED_DIR}/")
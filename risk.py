@@ -10,7 +10,7 @@ def compute_risk(eval_result, word_count, target_min, target_max):
         "low_entity_coverage": bool(eval_result.get("entity_coverage_low")),
         "hard_readability":    eval_result.get("fkgl", 0) > FKGL_HARD_THRESHOLD,
         "hallucination":       bool(eval_result.get("hallucination_flag")),
-        "toxicity_flag":       False,  
+        "toxicity_flag":       bool(eval_result.get("toxicity_flag")),
         "length_violation":    not (target_min <= word_count <= target_max),
     }
 
@@ -0,0 +1,34 @@
+"""Coalesce identical concurrent async calls into one execution."""
+import asyncio
+
+
+class SingleFlight:
+    """Concurrent run() calls with the same key share one execution.
+
+    The first caller starts `factory()` as a task and later callers with the
+    same key await that task instead of starting their own. The task is
+    shielded, so one caller going away doesn't cancel it for the others.
+    The key is forgotten as soon as the task finishes; results are not cached.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def run(self, key, factory):
+        """Returns (result, shared); shared is True when the call joined one already in flight."""
+        task = self._inflight.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()   # retrieved here, so an error nobody awaited isn't logged
@@ -0,0 +1,92 @@
+import json, sqlite3, threading
+from pathlib import Path
+
+from config import RESULTS_DB
+from metrics import WRITE_SECONDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    article_id  TEXT NOT NULL,
+    created_at  TEXT NOT NULL,
+    risk_level  TEXT,
+    escalate    INTEGER,
+    record      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_created ON results (created_at);
+CREATE INDEX IF NOT EXISTS idx_results_risk ON results (risk_level, escalate);
+"""
+
+
+class ResultStore:
+    """Append-only result log in SQLite.
+
+    WAL mode lets readers run alongside a writer, and every append is a
+    single INSERT, so concurrent requests (or uvicorn workers) never
+    rewrite or clobber each other's records.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.is_new = not Path(self.path).exists()
+        self._local = threading.local()
+        with self._conn() as c:
+            c.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, rec):
+        self.append_many([rec])
+
+    def append_many(self, records):
+        rows = [
+            (
+                r["article_id"], r.get("created_at", ""), r.get("risk_level"),
+                int(bool(r.get("escalate"))), json.dumps(r),
+            )
+            for r in records
+        ]
+        with WRITE_SECONDS.time(writer="store"), self._conn() as c:
+            c.executemany(
+                "INSERT INTO results (article_id, created_at, risk_level, escalate, record) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def _where(self, risk_level=None, escalate=None, since=None, until=None):
+        clauses, args = [], []
+        if risk_level:
+            clauses.append("risk_level = ?")
+            args.append(risk_level)
+        if escalate is not None:
+            clauses.append("escalate = ?")
+            args.append(int(escalate))
+        if since:
+            clauses.append("created_at >= ?")
+            args.append(since)
+        if until:
+            clauses.append("created_at < ?")
+            args.append(until)
+        sql = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        return sql, args
+
+    def query(self, limit=100, offset=0, **filters):
+        """One page of records, oldest first, filtered by risk/escalate/date."""
+        where, args = self._where(**filters)
+        cur = self._conn().execute(
+            f"SELECT record FROM results{where} ORDER BY id LIMIT ? OFFSET ?",
+            (*args, limit, offset),
+        )
+        return [json.loads(row[0]) for row in cur]
+
+    def count(self, **filters):
+        where, args = self._where(**filters)
+        return self._conn().execute(f"SELECT COUNT(*) FROM results{where}", args).fetchone()[0]
@@ -1,10 +1,21 @@
-import re
-import requests
+import asyncio, hashlib, json, re, time
+from concurrent.futures import ThreadPoolExecutor
 
 from config import (
-    OLLAMA_BASE_URL, OLLAMA_MODEL,
-    MAX_RETRIES, MIN_INPUT_WORDS, SYSTEM_PROMPT,
-    summary_bounds,
+    OLLAMA_BASE_URL, OLLAMA_MODEL, OLLAMA_TIMEOUT, OLLAMA_MAX_CONNECTIONS,
+    OLLAMA_KEEP_ALIVE, OLLAMA_BACKENDS,
+    MAX_RETRIES, MIN_INPUT_WORDS, SYSTEM_PROMPT, GENERATION_OPTIONS,
+    SUMMARY_CANDIDATES, RETRY_TOKEN_BUDGET, RETRY_TIME_BUDGET,
+    TOKENS_PER_WORD, NUM_PREDICT_MARGIN, STREAM_CUTOFF_SLACK,
+    CHUNK_THRESHOLD_WORDS, CHUNK_WORDS, CHUNK_SUMMARY_WORDS, CHUNK_CONCURRENCY,
+    SUMMARY_CACHE_ENABLED, summary_bounds,
+)
+from backends import BackendPool
+from cache import SummaryCache, cache_key
+from evaluator import numeric_consistency
+from metrics import (
+    OLLAMA_SECONDS, OLLAMA_TOKENS, OLLAMA_PROMPT_TOKENS, OLLAMA_ABORTED,
+    SUMMARY_RETRIES, SUMMARY_WASTED_TOKENS, SUMMARY_CACHE,
 )
 from utils import count_words, is_health_content
 
@@ -12,6 +23,8 @@ _BOLD = re.compile(r"\*\*(.+?)\*\*")
 _ITALIC = re.compile(r"\*(.+?)\*")
 _HEADER = re.compile(r"^#{1,6}\s+", flags=re.MULTILINE)
 _BULLET = re.compile(r"^[-*]\s+", flags=re.MULTILINE)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_LINE_BREAK = re.compile(r"\s*\n\s*")
 
 
 def _clean(text):
@@ -23,24 +36,211 @@ def _clean(text):
     return text.strip()
 
 
-def _call_ollama(prompt):
-    full = SYSTEM_PROMPT + "\n\n" + prompt
-    r = requests.post(
-        f"{OLLAMA_BASE_URL}/api/generate",
-        json={
-            "model": OLLAMA_MODEL,
-            "prompt": full,
-            "stream": False,
-            "options": {"temperature": 0.3, "num_predict": 400},
-        },
-        timeout=120,
-    )
-    r.raise_for_status()
-    return _clean(r.json().get("response", "").strip())
+def _num_predict(hi):
+    """Token budget just large enough for a summary at the top of the window."""
+    return int(hi * TOKENS_PER_WORD) + NUM_PREDICT_MARGIN
+
+
+def _payload(prompt, hi, context=None):
+    body = {
+        "model": OLLAMA_MODEL,
+        "system": SYSTEM_PROMPT,
+        "prompt": prompt,
+        "stream": True,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {**GENERATION_OPTIONS, "num_predict": _num_predict(hi)},
+    }
+    if context:
+        # continue the conversation Ollama already encoded instead of re-sending it
+        body["context"] = context
+    return body
+
+
+class _Stream:
+    """Collects streamed tokens and says when the output has overshot the window."""
+
+    def __init__(self, max_words=None):
+        self.parts = []
+        self.words = 0
+        self.max_words = max_words
+        self.aborted = False
+        self.tokens = 0
+        self.prompt_tokens = 0
+        self.context = None   # encoded conversation, only sent once a generation finishes
+        self.url = None
+
+    def feed(self, line):
+        """Add one NDJSON chunk; returns True when generation should stop."""
+        if not line:
+            return False
+        chunk = json.loads(line)
+        tok = chunk.get("response", "")
+        self.parts.append(tok)
+        if chunk.get("done"):
+            self.tokens = chunk.get("eval_count", self.tokens)
+            self.prompt_tokens = chunk.get("prompt_eval_count", 0)
+            self.context = chunk.get("context")
+            return True
+        self.tokens += 1
+        if self.max_words is not None and any(c.isspace() for c in tok):
+            self.words = count_words("".join(self.parts))
+            if self.words > self.max_words + STREAM_CUTOFF_SLACK:
+                self.aborted = True
+                return True
+        return False
+
+    def text(self):
+        return _clean("".join(self.parts).strip())
+
+    def record(self, kind):
+        OLLAMA_TOKENS.inc(self.tokens, kind=kind)
+        OLLAMA_PROMPT_TOKENS.inc(self.prompt_tokens, kind=kind)
+        if self.aborted:
+            OLLAMA_ABORTED.inc(kind=kind)
+
+
+_pool = None
+
+
+def _get_pool():
+    """Backend pool for the configured servers, rebuilt if the list changes."""
+    global _pool
+    urls = tuple(OLLAMA_BACKENDS or [OLLAMA_BASE_URL])
+    if _pool is None or _pool.urls != urls:
+        _pool = BackendPool(urls)
+    return _pool
+
+
+def backend_status():
+    return _get_pool().status()
+
+
+def _is_down(exc, transport_errors, status_error):
+    """True when the error says the backend is unreachable or broken, not that the request was bad."""
+    if isinstance(exc, transport_errors):
+        return True
+    response = getattr(exc, "response", None)
+    return isinstance(exc, status_error) and response is not None and response.status_code >= 500
+
+
+def _generate(prompt, hi, cutoff=True, kind="summary", context=None, prefer=None):
+    """Generate once, abandoning it early once it runs past `hi` words; returns the _Stream.
+
+    `context` continues an earlier generation; `prefer` names the backend
+    that still has it cached, if it has a free slot.
+    """
+    import requests
+
+    def attempt(url):
+        acc = _Stream(hi if cutoff else None)
+        acc.url = url
+        with OLLAMA_SECONDS.time(kind=kind), requests.post(
+            f"{url}/api/generate",
+            json=_payload(prompt, hi, context),
+            timeout=OLLAMA_TIMEOUT,
+            stream=True,
+        ) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if acc.feed(line):
+                    break
+        return acc
+
+    acc = _get_pool().call(attempt, lambda exc: _is_down(
+        exc, (requests.ConnectionError, requests.Timeout), requests.HTTPError,
+    ), prefer)
+    acc.record(kind)
+    return acc
 
 
-def _make_prompt(article, lo, hi, attempt):
-    p = f"Summarize this health article in {lo} to {hi} words:\n\n{article}"
+def _call_ollama(prompt, hi, cutoff=True, kind="summary"):
+    return _generate(prompt, hi, cutoff, kind).text()
+
+
+def warm_up():
+    """Ask every Ollama backend to load the model now; a generate call with no prompt only loads it.
+
+    Backends that fail are ejected; this only raises if none of them answered.
+    """
+    import requests
+    pool = _get_pool()
+    errors = []
+    for b in pool.backends:
+        try:
+            r = requests.post(
+                f"{b.url}/api/generate",
+                json={"model": OLLAMA_MODEL, "keep_alive": OLLAMA_KEEP_ALIVE},
+                timeout=OLLAMA_TIMEOUT,
+            )
+            r.raise_for_status()
+        except requests.RequestException as exc:
+            pool.report(b, ok=False)
+            errors.append(exc)
+        else:
+            pool.report(b, ok=True)
+    if len(errors) == len(pool.backends):
+        raise errors[0]
+
+
+# one pooled client per process, created on first use inside the event loop
+_async_client = None
+
+
+def _get_async_client():
+    global _async_client
+    if _async_client is None:
+        import httpx
+        # enough connections for every backend to be full at once
+        slots = sum(b.max_inflight for b in _get_pool().backends)
+        _async_client = httpx.AsyncClient(
+            timeout=OLLAMA_TIMEOUT,
+            limits=httpx.Limits(max_connections=max(OLLAMA_MAX_CONNECTIONS, slots)),
+        )
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+async def _generate_async(prompt, hi, cutoff=True, kind="summary", context=None, prefer=None):
+    import httpx
+
+    async def attempt(url):
+        acc = _Stream(hi if cutoff else None)
+        acc.url = url
+        with OLLAMA_SECONDS.time(kind=kind):
+            async with _get_async_client().stream(
+                "POST", f"{url}/api/generate", json=_payload(prompt, hi, context)
+            ) as r:
+                r.raise_for_status()
+                async for line in r.aiter_lines():
+                    if acc.feed(line):
+                        break
+        return acc
+
+    acc = await _get_pool().call_async(attempt, lambda exc: _is_down(
+        exc, httpx.TransportError, httpx.HTTPStatusError,
+    ), prefer)
+    acc.record(kind)
+    return acc
+
+
+async def _call_ollama_async(prompt, hi, cutoff=True, kind="summary"):
+    return (await _generate_async(prompt, hi, cutoff, kind)).text()
+
+
+def _make_prompt(article, lo, hi, attempt, sections=False):
+    if sections:
+        p = (
+            "These are summaries of consecutive sections of one health article. "
+            f"Combine them into a single summary of {lo} to {hi} words:\n\n{article}"
+        )
+    else:
+        p = f"Summarize this health article in {lo} to {hi} words:\n\n{article}"
     if attempt > 0:
         p += (
             f"\n\nIMPORTANT: Your previous attempt was outside the {lo}-{hi} word range. "
@@ -49,6 +249,91 @@ def _make_prompt(article, lo, hi, attempt):
     return p
 
 
+def _retry_prompt(wc, lo, hi):
+    """Follow-up sent on top of the previous attempt's context; the article is already encoded."""
+    change = "Shorten" if wc > hi else "Expand"
+    return (
+        f"That summary is {wc} words, outside the {lo}-{hi} word range. "
+        f"{change} it to a summary in {lo} to {hi} words, keeping every number exactly. "
+        "Reply with the summary only."
+    )
+
+
+def _chunk_prompt(chunk):
+    return (
+        "Summarize this section of a longer health article in at most "
+        f"{CHUNK_SUMMARY_WORDS} words. Keep every number and statistic exactly:\n\n{chunk}"
+    )
+
+
+def _pieces(sent, max_words):
+    """A sentence as-is, or cut on line breaks and then every max_words words."""
+    if count_words(sent) <= max_words:
+        yield sent
+        return
+    for line in _LINE_BREAK.split(sent):
+        words = line.split()
+        for i in range(0, len(words), max_words):
+            yield " ".join(words[i:i + max_words])
+
+
+def _split_chunks(text, max_words=CHUNK_WORDS):
+    """Pack whole sentences into chunks of at most max_words.
+
+    Sentences longer than that (bullet lists, scraped text without
+    punctuation) are cut on line breaks, then by word count.
+    """
+    chunks, cur, n = [], [], 0
+    for sent in _SENTENCE_END.split(text.strip()):
+        for piece in _pieces(sent, max_words):
+            w = count_words(piece)
+            if cur and n + w > max_words:
+                chunks.append(" ".join(cur))
+                cur, n = [], 0
+            cur.append(piece)
+            n += w
+    if cur:
+        chunks.append(" ".join(cur))
+    return chunks
+
+
+def _condense(article_text):
+    """Map step: summarise sections until the text fits in one prompt.
+
+    Returns (text for the final pass, number of chunks at the first level).
+    """
+    source, first = article_text, 1
+    while count_words(source) > CHUNK_THRESHOLD_WORDS:
+        parts = _split_chunks(source)
+        with ThreadPoolExecutor(min(CHUNK_CONCURRENCY, len(parts))) as pool:
+            notes = list(pool.map(
+                lambda c: _call_ollama(
+                    _chunk_prompt(c), CHUNK_SUMMARY_WORDS, cutoff=False, kind="chunk"
+                ),
+                parts,
+            ))
+        source = "\n\n".join(notes)
+        first = first if first > 1 else len(parts)
+    return source, first
+
+
+async def _condense_async(article_text):
+    source, first = article_text, 1
+    sem = asyncio.Semaphore(CHUNK_CONCURRENCY)
+
+    async def one(chunk):
+        async with sem:
+            return await _call_ollama_async(
+                _chunk_prompt(chunk), CHUNK_SUMMARY_WORDS, cutoff=False, kind="chunk"
+            )
+
+    while count_words(source) > CHUNK_THRESHOLD_WORDS:
+        parts = _split_chunks(source)
+        source = "\n\n".join(await asyncio.gather(*map(one, parts)))
+        first = first if first > 1 else len(parts)
+    return source, first
+
+
 class InputTooShortError(ValueError):
     pass
 
@@ -57,31 +342,205 @@ class NotHealthContentError(ValueError):
     pass
 
 
-def summarize(article_text):
-    wc_in = count_words(article_text)
+def _target_bounds(article_text, profile=None):
+    """Validate the input and return the (lo, hi) summary word window."""
+    wc_in = profile["word_count"] if profile else count_words(article_text)
     if wc_in < MIN_INPUT_WORDS:
         raise InputTooShortError(
             f"Article must be at least {MIN_INPUT_WORDS} words (got {wc_in})."
         )
-    if not is_health_content(article_text):
+    if not (profile["health"] if profile else is_health_content(article_text)):
         raise NotHealthContentError(
             "This doesn't look like a health/medical article. "
             "The system only processes health-related content."
         )
+    return tuple(profile["bounds"]) if profile else summary_bounds(wc_in)
 
-    lo, hi = summary_bounds(wc_in)
 
-    summary, wc = "", 0
-    for attempt in range(MAX_RETRIES + 1):
-        summary = _call_ollama(_make_prompt(article_text, lo, hi, attempt))
+class _BestOf:
+    """Every candidate generated for one article, and the best one so far.
+
+    Candidates rank by: finished (not cut off mid-stream), distance in words
+    to [lo, hi], then how many of the article's numbers they dropped.
+    """
+
+    def __init__(self, article_text, lo, hi, numbers=None):
+        self.article, self.lo, self.hi = article_text, lo, hi
+        self.numbers = numbers
+        self.best = None   # (rank, summary, word count, tokens)
+        self.followup = None   # (context, word count, backend) of the best finished candidate
+        self.candidates = 0
+        self.tokens = 0
+        self.started = time.perf_counter()
+
+    def add(self, acc):
+        summary = acc.text()
         wc = count_words(summary)
-        if lo <= wc <= hi:
-            break
+        distance = max(self.lo - wc, wc - self.hi, 0)
+        missing = len(numeric_consistency(self.article, summary, self.numbers)["missing_numbers"])
+        rank = (acc.aborted, distance, missing)
+        self.candidates += 1
+        self.tokens += acc.tokens
+        if self.best is None or rank < self.best[0]:
+            self.best = (rank, summary, wc, acc.tokens)
+            self.followup = (acc.context, wc, acc.url) if acc.context else None
+
+    def next_request(self, source, attempt, sections):
+        """(prompt, context, preferred backend) for the next attempt.
+
+        After a finished attempt only the correction is sent, on top of its
+        context; otherwise the whole prompt goes out again.
+        """
+        if attempt and self.followup:
+            context, wc, url = self.followup
+            return _retry_prompt(wc, self.lo, self.hi), context, url
+        return _make_prompt(source, self.lo, self.hi, attempt, sections), None, None
+
+    def done(self):
+        return self.best is not None and self.best[0][:2] == (False, 0)
+
+    def in_budget(self):
+        if RETRY_TOKEN_BUDGET is not None and self.tokens >= RETRY_TOKEN_BUDGET:
+            return False
+        if RETRY_TIME_BUDGET is not None and time.perf_counter() - self.started >= RETRY_TIME_BUDGET:
+            return False
+        return True
 
+    def result(self, attempt, chunks, timings):
+        _, summary, wc, tokens = self.best
+        wasted = self.tokens - tokens
+        SUMMARY_RETRIES.inc(attempt)
+        SUMMARY_WASTED_TOKENS.inc(wasted)
+        return _result(
+            summary, wc, attempt, self.lo, self.hi, chunks, timings, self.candidates, wasted,
+        )
+
+
+def _result(summary, wc, attempt, lo, hi, chunks=1, timings=None, candidates=1, wasted_tokens=0):
     return {
         "summary": summary,
         "word_count": wc,
         "retries": attempt,
+        "candidates": candidates,
+        "wasted_tokens": wasted_tokens,
         "target_min": lo,
         "target_max": hi,
+        "chunks": chunks,
+        "timings": timings or {},
     }
+
+
+_cache = SummaryCache()
+
+
+def _cached(article_text, lo, hi, use_cache):
+    """Return (key, cached record or None); key is None when caching is off."""
+    if not (use_cache and SUMMARY_CACHE_ENABLED):
+        return None, None
+    key = cache_key(article_text, OLLAMA_MODEL, SYSTEM_PROMPT, (lo, hi), GENERATION_OPTIONS)
+    hit = _cache.get(key)
+    SUMMARY_CACHE.inc(result="miss" if hit is None else "hit")
+    if hit is not None:
+        hit["cached"] = True
+        hit["timings"] = {}
+    return key, hit
+
+
+def request_key(article_text, refresh=False):
+    """Identity of a summarisation request: normalised text plus everything that shapes the output."""
+    blob = json.dumps(
+        {
+            "text": " ".join(article_text.split()),
+            "model": OLLAMA_MODEL,
+            "system": SYSTEM_PROMPT,
+            "options": GENERATION_OPTIONS,
+            "retries": MAX_RETRIES,
+            "candidates": SUMMARY_CANDIDATES,
+            "refresh": refresh,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _store(key, res):
+    if key is not None:
+        _cache.put(key, res)
+    return res
+
+
+async def _off_loop(fn, *args):
+    # the disk cache globs and rewrites files; keep that off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def summarize(article_text, use_cache=True, profile=None):
+    """Summarise one article; `profile` (see profiles.py) skips re-analysing the source."""
+    lo, hi = _target_bounds(article_text, profile)
+    key, hit = _cached(article_text, lo, hi, use_cache)
+    if hit is not None:
+        return hit
+
+    # articles too long for one prompt are summarised section by section
+    # first; the window below still comes from the full article's length
+    t = time.perf_counter()
+    source, chunks = _condense(article_text)
+    timings = {"condense": round(time.perf_counter() - t, 4)} if chunks > 1 else {}
+
+    t = time.perf_counter()
+    best = _BestOf(article_text, lo, hi, profile and profile["numbers"])
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt and not best.in_budget():
+            attempt -= 1
+            break
+        prompt, context, prefer = best.next_request(source, attempt, sections=chunks > 1)
+        # the last attempt has no better one after it, so let it finish
+        cutoff = attempt < MAX_RETRIES
+        if SUMMARY_CANDIDATES > 1:
+            with ThreadPoolExecutor(SUMMARY_CANDIDATES) as pool:
+                accs = list(pool.map(
+                    lambda _: _generate(prompt, hi, cutoff, context=context, prefer=prefer),
+                    range(SUMMARY_CANDIDATES),
+                ))
+        else:
+            accs = [_generate(prompt, hi, cutoff, context=context, prefer=prefer)]
+        for acc in accs:
+            best.add(acc)
+        if best.done():
+            break
+
+    timings["generate"] = round(time.perf_counter() - t, 4)
+    return _store(key, best.result(attempt, chunks, timings))
+
+
+async def summarize_async(article_text, use_cache=True, profile=None):
+    """Same as summarize(), but awaits the LLM instead of blocking the event loop."""
+    lo, hi = _target_bounds(article_text, profile)
+    key, hit = await _off_loop(_cached, article_text, lo, hi, use_cache)
+    if hit is not None:
+        return hit
+
+    t = time.perf_counter()
+    source, chunks = await _condense_async(article_text)
+    timings = {"condense": round(time.perf_counter() - t, 4)} if chunks > 1 else {}
+
+    t = time.perf_counter()
+    best = _BestOf(article_text, lo, hi, profile and profile["numbers"])
+    for attempt in range(MAX_RETRIES + 1):
+        if attempt and not best.in_budget():
+            attempt -= 1
+            break
+        prompt, context, prefer = best.next_request(source, attempt, sections=chunks > 1)
+        accs = await asyncio.gather(*(
+            _generate_async(
+                prompt, hi, cutoff=attempt < MAX_RETRIES, context=context, prefer=prefer,
+            )
+            for _ in range(SUMMARY_CANDIDATES)
+        ))
+        for acc in accs:
+            best.add(acc)
+        if best.done():
+            break
+
+    timings["generate"] = round(time.perf_counter() - t, 4)
+    return await _off_loop(_store, key, best.result(attempt, chunks, timings))
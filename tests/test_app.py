@@ -0,0 +1,193 @@
+import json, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+
+
+@pytest.mark.parametrize("path", ["/api/batch", "/api/batch/stream"])
+@pytest.mark.parametrize("query", [
+    "num_shards=4",            # shard missing
+    "shard=1",                 # num_shards missing
+    "shard=4&num_shards=4",    # out of range
+    "shard=0&num_shards=0",
+    "start=-1",
+    "start=5&stop=2",
+])
+def test_bad_slice_is_rejected(path, query):
+    r = TestClient(app.app).post(f"{path}?{query}")
+    assert r.status_code == 422
+    assert "error" in r.json()
+
+
+@pytest.fixture
+def lifespan(monkeypatch):
+    """Run the app's startup/shutdown without touching real jobs or models."""
+    monkeypatch.setattr(app, "_jobs", SimpleNamespace(resume=lambda: None, shutdown=lambda: None))
+    monkeypatch.setattr(app, "_warm", {"nlp": "pending", "llm": "pending"})
+    monkeypatch.setattr(app, "_retry_at", {})
+    # shutdown closes the eval pool, so every lifespan needs its own
+    monkeypatch.setattr(app, "_eval_pool", ThreadPoolExecutor(2))
+    return monkeypatch
+
+
+def test_ready_when_warm_up_is_disabled(lifespan):
+    lifespan.setattr(app, "WARM_UP_ON_STARTUP", False)
+    with TestClient(app.app) as client:
+        r = client.get("/api/ready")
+    assert r.status_code == 200
+    assert r.json()["nlp"] == "skipped"
+
+
+def test_failed_warm_up_is_retried(lifespan):
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("model not pulled yet")
+
+    lifespan.setattr(app, "WARM_UP_ON_STARTUP", True)
+    lifespan.setattr(app, "WARM_UP_RETRY_SECONDS", 0)
+    lifespan.setattr(app, "_warmers", {
+        "nlp": SimpleNamespace(warm_up=lambda: None), "llm": SimpleNamespace(warm_up=flaky),
+    })
+    with TestClient(app.app) as client:
+        end = time.time() + 5
+        while time.time() < end:
+            r = client.get("/api/ready")
+            if r.status_code == 200:
+                break
+            time.sleep(0.02)
+    assert r.status_code == 200
+    assert len(calls) == 2
+
+
+@pytest.fixture
+def workspace(lifespan, tmp_path):
+    """A scratch data/ and results/ tree, NER stubbed out and Ollama mocked."""
+    import evaluator, profiles, summarizer
+    from benchmarks.mock_ollama import MockOllama
+    from store import ResultStore
+
+    lifespan.chdir(tmp_path)   # exports, manifest and caches are cwd-relative
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    no_entities = lambda texts, **kw: [[] for _ in texts]
+    lifespan.setattr(evaluator, "extract_entities_batch", no_entities)
+    lifespan.setattr(profiles, "extract_entities_batch", no_entities)
+    lifespan.setattr(evaluator, "extract_entities", lambda text: [])
+    lifespan.setattr(app, "RAW_ARTICLES_DIR", str(raw))
+    lifespan.setattr(app, "WARM_UP_ON_STARTUP", False)
+    lifespan.setattr(app, "_store", ResultStore(tmp_path / "results.db"))
+    with MockOllama() as mock:
+        lifespan.setattr(summarizer, "OLLAMA_BASE_URL", mock.url)
+        yield raw, mock
+
+
+ARTICLES = Path(__file__).resolve().parent.parent / "data" / "raw_articles"
+
+
+def test_incremental_batch_only_reruns_changes(workspace):
+    import utils
+    raw, mock = workspace
+    for name in ("covid", "diabetes"):
+        (raw / f"{name}.txt").write_text((ARTICLES / f"{name}.txt").read_text())
+
+    with TestClient(app.app) as client:
+        first = client.post("/api/batch?incremental=true").json()
+        assert first["processed"] == 2
+        assert len(utils.load_summaries_json()) == 2
+        calls = len(mock.requests)
+
+        again = client.post("/api/batch?incremental=true").json()
+        assert again["processed"] == 0 and again["count"] == 2
+        assert len(mock.requests) == calls
+
+        (raw / "covid.txt").unlink()
+        (raw / "diabetes.txt").write_text((ARTICLES / "mental_health.txt").read_text())
+        last = client.post("/api/batch?incremental=true").json()
+
+    assert last["processed"] == 1
+    assert last["deleted"] == ["covid"]
+    assert [r["article_id"] for r in utils.load_summaries_json()] == ["diabetes"]
+
+
+def test_edit_during_full_run_is_picked_up_incrementally(workspace, monkeypatch):
+    raw, mock = workspace
+    for name in ("covid", "diabetes"):
+        (raw / f"{name}.txt").write_text((ARTICLES / f"{name}.txt").read_text())
+    process = app._process_articles
+
+    async def edit_mid_run(articles, refresh=False):
+        # the file changes after the run has read it
+        (raw / "covid.txt").write_text((ARTICLES / "mental_health.txt").read_text())
+        return await process(articles, refresh)
+
+    with TestClient(app.app) as client:
+        monkeypatch.setattr(app, "_process_articles", edit_mid_run)
+        assert client.post("/api/batch").json()["count"] == 2
+        monkeypatch.setattr(app, "_process_articles", process)
+        again = client.post("/api/batch?incremental=true").json()
+    assert again["processed"] == 1
+    assert [r["article_id"] for r in again["records"]] == ["covid", "diabetes"]
+
+
+def _stream(client, query=""):
+    r = client.post(f"/api/batch/stream{query}")
+    return [json.loads(line) for line in r.text.splitlines()]
+
+
+def _seed(raw, names=("covid", "diabetes", "mental_health")):
+    for name in names:
+        (raw / f"{name}.txt").write_text((ARTICLES / f"{name}.txt").read_text())
+
+
+def test_stream_emits_progress_then_done(workspace, monkeypatch):
+    import utils
+    raw, _ = workspace
+    _seed(raw)
+    exported = []
+    append = app._append
+    # whether the exports exist yet, as each record reaches the store
+    monkeypatch.setattr(app, "_append", lambda rec: exported.append(Path(utils.SUMMARIES_FILE).exists()) or append(rec))
+
+    with TestClient(app.app) as client:
+        lines = _stream(client)
+
+    assert [m["type"] for m in lines] == ["start", "record", "record", "record", "done"]
+    assert lines[0]["total"] is None
+    assert [m["done"] for m in lines[1:4]] == [1, 2, 3]
+    assert lines[-1]["count"] == 3 and lines[-1]["total"] == 3
+    assert all(m["rate"] > 0 for m in lines[1:4])
+    assert exported == [False, False, False]
+    ids = sorted(r["article_id"] for r in utils.load_summaries_json())
+    assert ids == sorted(m["record"]["article_id"] for m in lines[1:4])
+
+
+def test_stream_failure_keeps_previous_exports(workspace, monkeypatch):
+    import utils
+    raw, _ = workspace
+    _seed(raw)
+    utils.save_results([{"article_id": "old"}])
+    before = Path(utils.SUMMARIES_FILE).read_text()
+    evaluate, bad = app.evaluate, (raw / "diabetes.txt").read_text().strip()
+
+    def flaky(original, *args):
+        if original == bad:
+            raise RuntimeError("scoring failed")
+        return evaluate(original, *args)
+
+    monkeypatch.setattr(app, "evaluate", flaky)
+    with TestClient(app.app) as client:
+        lines = _stream(client)
+
+    assert lines[0]["type"] == "start"
+    assert lines[-1] == {"type": "error", "error": "scoring failed"}
+    assert Path(utils.SUMMARIES_FILE).read_text() == before
+    assert list(Path(utils.SUMMARIES_FILE).parent.glob("*.tmp")) == []
@@ -0,0 +1,115 @@
+import asyncio, socket, sys, threading, time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+import summarizer
+from backends import BackendPool, NoBackendError
+from benchmarks.mock_ollama import MockOllama
+
+ARTICLE = (Path(__file__).resolve().parent.parent / "data" / "raw_articles" / "covid.txt").read_text()
+
+
+@pytest.fixture
+def mocks(monkeypatch):
+    with MockOllama() as a, MockOllama() as b:
+        monkeypatch.setattr(summarizer, "OLLAMA_BACKENDS", [a.url, b.url])
+        monkeypatch.setattr(summarizer, "_pool", None)
+        yield a, b
+
+
+def _dead_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def test_spreads_generations_across_backends(mocks):
+    a, b = mocks
+    for _ in range(4):
+        summarizer.summarize(ARTICLE, use_cache=False)
+    assert len(a.requests) == 2 and len(b.requests) == 2
+
+
+def test_fails_over_and_ejects_a_failing_backend(mocks):
+    a, b = mocks
+    a.fail = True
+    for _ in range(3):
+        r = summarizer.summarize(ARTICLE, use_cache=False)
+        assert r["target_min"] <= r["word_count"] <= r["target_max"]
+    assert len(b.requests) == 3
+    status = {s["url"]: s for s in summarizer.backend_status()}
+    assert not status[a.url]["healthy"] and status[b.url]["healthy"]
+
+
+def test_connection_refused_fails_over(mocks, monkeypatch):
+    _, b = mocks
+    monkeypatch.setattr(summarizer, "OLLAMA_BACKENDS", [_dead_url(), b.url])
+    summarizer.summarize(ARTICLE, use_cache=False)
+    assert len(b.requests) == 1
+
+
+def test_ejected_backend_is_reprobed(mocks):
+    a, b = mocks
+    pool = summarizer._get_pool()
+    pool.eject_seconds = 0.05
+    a.fail = True
+    summarizer.summarize(ARTICLE, use_cache=False)
+    a.fail = False
+    time.sleep(0.1)
+    for _ in range(4):
+        summarizer.summarize(ARTICLE, use_cache=False)
+    assert a.requests
+    assert all(s["healthy"] for s in summarizer.backend_status())
+
+
+def test_retries_stay_on_the_backend_holding_the_context(mocks):
+    for m in mocks:
+        m.mode = "under"
+    summarizer.summarize(ARTICLE, use_cache=False)
+    assert sorted(len(m.requests) for m in mocks) == [0, 3]
+
+
+def test_all_backends_down_raises(mocks):
+    for m in mocks:
+        m.fail = True
+    with pytest.raises(Exception):
+        summarizer.summarize(ARTICLE, use_cache=False)
+
+
+def test_async_uses_every_backend(mocks):
+    a, b = mocks
+
+    async def run():
+        try:
+            await asyncio.gather(*(summarizer.summarize_async(ARTICLE, use_cache=False) for _ in range(4)))
+        finally:
+            await summarizer.close_async_client()
+
+    asyncio.run(run())
+    assert a.requests and b.requests
+
+
+def test_per_backend_concurrency_limit():
+    pool = BackendPool(["http://a", "http://b"], max_inflight=1)
+    first, second = pool.acquire(), pool.acquire()
+    assert {first.url, second.url} == {"http://a", "http://b"}
+    with pytest.raises(NoBackendError):
+        pool.acquire(timeout=0.05)
+
+    got = []
+    t = threading.Thread(target=lambda: got.append(pool.acquire(timeout=2)))
+    t.start()
+    pool.release(first, ok=True)
+    t.join()
+    assert got == [first]
+
+
+def test_least_loaded_wins():
+    pool = BackendPool(["http://a", "http://b"], max_inflight=4)
+    busy = pool.acquire()
+    for _ in range(3):
+        b = pool.acquire()
+        assert b is not busy
+        pool.release(b, ok=True)
@@ -1,8 +1,10 @@
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-from evaluator import entity_coverage, entity_coverage_flag
+import evaluator
+from evaluator import EvalContext, _TokenIndex, entity_coverage, entity_coverage_flag, hallucination_check
 
 
 def test_returns_float():
@@ -36,3 +38,62 @@ def test_no_entities_means_nothing_to_miss():
 def test_flag_triggers_below_threshold():
     assert entity_coverage_flag(0.5) is True
     assert entity_coverage_flag(0.8) is False
+
+
+def _ctx(original, summary, orig, summ):
+    # entities given up front, so no spaCy model is needed
+    return EvalContext(
+        original, summary,
+        [{"text": e, "label": "ORG"} for e in orig],
+        [{"text": e, "label": "ORG"} for e in summ],
+    )
+
+
+def test_token_index_matches_whole_tokens_only():
+    idx = _TokenIndex("The whole ward at St. Mary's Hospital saw COVID-19 cases rise.")
+    assert "st. mary's hospital" in idx
+    assert "covid-19" in idx
+    assert "who" not in idx
+    assert "hospital saw" in idx
+    assert "ward hospital" not in idx
+
+
+def test_token_index_long_phrases():
+    text = "one two three four five six seven eight nine ten"
+    idx = _TokenIndex(text)
+    assert text in idx
+    assert "three four five six seven eight nine" in idx
+    assert "three four five six seven eight ten" not in idx
+
+
+def test_coverage_uses_whole_tokens():
+    original = "The WHO issued guidance."
+    summary = "The whole guidance was issued."
+    ctx = _ctx(original, summary, ["who"], [])
+    assert entity_coverage(original, summary, ctx) == 0.0
+
+
+def test_hallucination_ignores_entities_in_source_text():
+    original = "Researchers at Johns Hopkins University studied 400 patients."
+    summary = "Johns Hopkins University and the Mayo Clinic studied patients."
+    ctx = _ctx(original, summary, [], ["johns hopkins university", "mayo clinic"])
+    assert hallucination_check(original, summary, ctx)["extra_entities"] == ["mayo clinic"]
+
+
+def test_symbols_are_part_of_the_match():
+    original = "The trial enrolled 50 patients at a cost of 5 million."
+    summary = "Mortality reached 50% in the trial, costing $5 million."
+    ctx = _ctx(original, summary, [], ["50%", "$5 million"])
+    assert hallucination_check(original, summary, ctx)["extra_entities"] == ["$5 million", "50%"]
+    assert "50" in _TokenIndex(summary)
+
+
+def test_entity_cache_is_thread_safe(monkeypatch):
+    monkeypatch.setattr(evaluator, "_parse_entities", lambda t: [{"text": t, "label": "ORG"}])
+    monkeypatch.setattr(evaluator, "ENTITY_CACHE_SIZE", 8)
+    monkeypatch.setattr(evaluator, "_ent_cache", evaluator.OrderedDict())
+    texts = [f"text {i % 20}" for i in range(5000)]
+    with ThreadPoolExecutor(8) as pool:
+        out = list(pool.map(evaluator.extract_entities, texts))
+    assert [e[0]["text"] for e in out] == texts
+    assert len(evaluator._ent_cache) <= 8
@@ -0,0 +1,70 @@
+import csv, json, stat, sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+import utils
+from utils import ResultWriter, EVALUATION_COLUMNS
+
+
+def _export(records, tmp_path, **kw):
+    with ResultWriter(tmp_path / "s.json", tmp_path / "e.csv", **kw) as w:
+        for rec in records:
+            w.write(rec)
+
+
+def test_json_round_trip(tmp_path):
+    recs = [{"article_id": f"a{i}", "summary": "s"} for i in range(3)]
+    _export(iter(recs), tmp_path)
+    assert json.loads((tmp_path / "s.json").read_text()) == recs
+
+
+def test_empty_json_is_valid(tmp_path):
+    _export([], tmp_path)
+    assert json.loads((tmp_path / "s.json").read_text()) == []
+
+
+def test_jsonl_has_one_record_per_line(tmp_path):
+    recs = [{"article_id": f"a{i}", "summary": "s"} for i in range(3)]
+    _export(recs, tmp_path, jsonl_path=tmp_path / "s.jsonl")
+    lines = (tmp_path / "s.jsonl").read_text().splitlines()
+    assert [json.loads(l) for l in lines] == recs
+
+
+def test_csv_fills_missing_columns(tmp_path):
+    _export([{"article_id": "a", "fkgl": 8.5, "extra": 1}], tmp_path)
+    with open(tmp_path / "e.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert list(rows[0]) == EVALUATION_COLUMNS
+    assert rows[0]["fkgl"] == "8.5"
+    assert rows[0]["risk_level"] == ""
+
+
+def test_aborted_writer_keeps_previous_files(tmp_path):
+    js, cv = tmp_path / "s.json", tmp_path / "e.csv"
+    _export([{"article_id": "old"}], tmp_path)
+    cv.unlink()
+    try:
+        with ResultWriter(js, cv) as w:
+            w.write({"article_id": "new"})
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert json.loads(js.read_text()) == [{"article_id": "old"}]
+    assert not cv.exists()
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_exports_follow_the_umask(tmp_path):
+    # not mkstemp's 0600
+    _export([{"article_id": "a"}], tmp_path)
+    for name in ("s.json", "e.csv"):
+        assert stat.S_IMODE((tmp_path / name).stat().st_mode) == 0o666 & ~utils._UMASK
+
+
+def test_failed_writer_setup_leaves_no_temp_files(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)   # import fails
+    with pytest.raises(RuntimeError, match="pyarrow"):
+        ResultWriter(tmp_path / "s.json", tmp_path / "e.csv", parquet_path=tmp_path / "e.parquet")
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import is_health_content, load_articles
+
+
+def test_sample_articles_pass():
+    arts = load_articles(Path(__file__).resolve().parent.parent / "data" / "raw_articles")
+    assert arts
+    assert all(is_health_content(a["text"]) for a in arts)
+
+
+def test_non_medical_text_rejected():
+    text = (
+        "The football season opened with a close match. Fans filled the stadium "
+        "and the home side scored twice in the second half to win the game."
+    )
+    assert not is_health_content(text)
+
+
+def test_keywords_match_whole_words_only():
+    # every token here contains a keyword as a substring, none as a word
+    text = "whole cellar organic genealogy bloodhound studious " * 5
+    assert not is_health_content(text)
+
+
+def test_counts_distinct_keywords():
+    assert not is_health_content("patient " * 50)
+    assert is_health_content("Patient, clinical trial: the VACCINE cohort study.")
+
+
+def test_multi_word_phrase():
+    # "public health" counts on top of "health" itself
+    assert is_health_content("Immune disorder in the cell: a public\n health view.")
+    assert not is_health_content("Immune disorder in the cell: a public view of health.")
@@ -0,0 +1,123 @@
+import json, sys, time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from jobs import JobManager
+
+
+def _articles(tmp_path, n):
+    d = tmp_path / "raw"
+    d.mkdir()
+    for i in range(n):
+        (d / f"a{i}.txt").write_text(f"article {i}")
+    return d
+
+
+def _wait(mgr, job_id, timeout=5):
+    end = time.time() + timeout
+    while time.time() < end:
+        state = mgr.get(job_id)
+        if state["status"] not in ("queued", "running"):
+            return state
+        time.sleep(0.02)
+    raise AssertionError("job did not finish")
+
+
+def test_runs_to_completion(tmp_path):
+    finished = []
+    mgr = JobManager(
+        lambda art, refresh: {"article_id": art["id"]},
+        on_finish=finished.append,
+        directory=tmp_path / "jobs", articles_dir=_articles(tmp_path, 5),
+    )
+    job_id = mgr.submit()
+    state = _wait(mgr, job_id)
+    assert state["status"] == "done"
+    assert state["done"] == 5
+    assert sorted(r["article_id"] for r in finished[0]) == [f"a{i}" for i in range(5)]
+
+
+def test_errors_and_skips_do_not_stop_the_job(tmp_path):
+    def process(art, refresh):
+        if art["id"] == "a1":
+            raise RuntimeError("boom")
+        if art["id"] == "a2":
+            return None
+        return {"article_id": art["id"]}
+
+    mgr = JobManager(process, directory=tmp_path / "jobs", articles_dir=_articles(tmp_path, 4))
+    state = _wait(mgr, mgr.submit())
+    assert state["done"] == 2
+    assert state["skipped"] == 1
+    assert state["errors"][0]["id"] == "a1"
+
+
+def test_resume_skips_checkpointed_articles(tmp_path):
+    raw = _articles(tmp_path, 4)
+    job_dir = tmp_path / "jobs" / "abc"
+    job_dir.mkdir(parents=True)
+    (job_dir / "job.json").write_text(json.dumps({
+        "id": "abc", "status": "running", "refresh": False,
+        "articles": ["a0", "a1", "a2", "a3"], "total": 4, "done": 2, "skipped": 0, "errors": [],
+    }))
+    with open(job_dir / "checkpoint.jsonl", "w") as f:
+        for aid in ("a0", "a1"):
+            f.write(json.dumps({"id": aid, "record": {"article_id": aid}}) + "\n")
+
+    calls = []
+    mgr = JobManager(
+        lambda art, refresh: calls.append(art["id"]) or {"article_id": art["id"]},
+        directory=tmp_path / "jobs", articles_dir=raw,
+    )
+    mgr.resume()
+    state = _wait(mgr, "abc")
+    assert sorted(calls) == ["a2", "a3"]
+    assert state["done"] == 4
+    assert len(mgr.records("abc")) == 4
+
+
+def test_jsonl_corpus_is_processed(tmp_path):
+    raw = _articles(tmp_path, 1)
+    (raw / "corpus.jsonl").write_text(
+        json.dumps({"id": "j0", "text": "first"}) + "\n" + json.dumps({"id": "j1", "text": "second"}) + "\n"
+    )
+    texts = {}
+    mgr = JobManager(
+        lambda art, refresh: texts.setdefault(art["id"], art["text"]) and {"article_id": art["id"]},
+        directory=tmp_path / "jobs", articles_dir=raw,
+    )
+    state = _wait(mgr, mgr.submit())
+    assert state["total"] == 3
+    assert state["done"] == 3
+    assert texts == {"a0": "article 0", "j0": "first", "j1": "second"}
+
+
+def test_failing_finish_hook_fails_the_job(tmp_path):
+    def on_finish(records):
+        raise OSError("disk full")
+
+    mgr = JobManager(
+        lambda art, refresh: {"article_id": art["id"]}, on_finish=on_finish,
+        directory=tmp_path / "jobs", articles_dir=_articles(tmp_path, 2),
+    )
+    state = _wait(mgr, mgr.submit())
+    assert state["status"] == "failed"
+    assert state["done"] == 2
+    assert state["errors"] == [{"id": None, "error": "OSError: disk full"}]
+
+
+def test_list_is_newest_first(tmp_path):
+    mgr = JobManager(
+        lambda art, refresh: {"article_id": art["id"]},
+        directory=tmp_path / "jobs", articles_dir=_articles(tmp_path, 1),
+    )
+    # an older job from before ids were time-ordered
+    old = tmp_path / "jobs" / "ffffffffffff"
+    old.mkdir(parents=True)
+    (old / "job.json").write_text(json.dumps({
+        "id": "ffffffffffff", "status": "done", "created_at": "2020-01-01T00:00:00+00:00",
+    }))
+    ids = [mgr.submit() for _ in range(3)]
+    for job_id in ids:
+        _wait(mgr, job_id)
+    assert [j["id"] for j in mgr.list()] == ids[::-1] + ["ffffffffffff"]
@@ -0,0 +1,70 @@
+import json, sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import utils
+from utils import iter_articles, load_articles, shard_of
+
+
+def _corpus(tmp_path):
+    (tmp_path / "b.txt").write_text("  second article  ", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("first article", encoding="utf-8")
+    (tmp_path / "notes.md").write_text("ignored", encoding="utf-8")
+    lines = [{"id": "j1", "text": "from jsonl"}, {"text": "no id"}]
+    (tmp_path / "c.jsonl").write_text(
+        "\n".join(json.dumps(o) for o in lines) + "\n\n", encoding="utf-8")
+    return tmp_path
+
+
+def test_reads_txt_and_jsonl_in_name_order(tmp_path):
+    arts = list(iter_articles(_corpus(tmp_path)))
+    assert [a["id"] for a in arts] == ["a", "b", "j1", "c_1"]
+    assert arts[1]["text"] == "second article"
+    assert load_articles(tmp_path) == arts
+
+
+def test_is_lazy(tmp_path):
+    it = iter_articles(_corpus(tmp_path))
+    assert next(it)["id"] == "a"
+
+
+def test_mmap_path_matches_plain_read(tmp_path, monkeypatch):
+    _corpus(tmp_path)
+    (tmp_path / "empty.txt").write_text("", encoding="utf-8")
+    plain = list(iter_articles(tmp_path))
+    monkeypatch.setattr(utils, "MMAP_THRESHOLD_BYTES", 0)
+    assert list(iter_articles(tmp_path)) == plain
+
+
+def test_shards_partition_the_corpus(tmp_path):
+    _corpus(tmp_path)
+    every = [a["id"] for a in iter_articles(tmp_path)]
+    parts = [[a["id"] for a in iter_articles(tmp_path, shard=i, num_shards=3)] for i in range(3)]
+    assert sorted(sum(parts, [])) == sorted(every)
+    assert all(shard_of(aid, 3) == i for i, p in enumerate(parts) for aid in p)
+
+
+def test_index_range(tmp_path):
+    ids = [a["id"] for a in iter_articles(_corpus(tmp_path), start=1, stop=3)]
+    assert ids == ["b", "j1"]
+
+
+def test_missing_directory(tmp_path):
+    assert list(iter_articles(tmp_path / "nope")) == []
+
+
+def test_malformed_jsonl_lines_are_skipped(tmp_path, caplog):
+    (tmp_path / "c.jsonl").write_text(
+        json.dumps({"id": "ok1", "text": "fine"}) + "\n"
+        "not json\n"
+        + json.dumps({"id": "bad", "text": 42}) + "\n"
+        + json.dumps(["a", "list"]) + "\n"
+        + json.dumps({"id": "ok2", "text": "also fine"}) + "\n",
+        encoding="utf-8",
+    )
+    with caplog.at_level("WARNING"):
+        arts = list(iter_articles(tmp_path))
+    assert [a["id"] for a in arts] == ["ok1", "ok2"]
+    assert [r.getMessage().split(": skipping")[0] for r in caplog.records] == [
+        f"{tmp_path / 'c.jsonl'}:{n}" for n in (2, 3, 4)
+    ]
@@ -0,0 +1,115 @@
+import json, os, sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config
+from manifest import scan, article_ids, config_version
+
+
+def _jsonl(fp, rows):
+    fp.write_text("".join(json.dumps({"id": i, "text": t}) + "\n" for i, t in rows))
+
+
+def test_jsonl_articles_are_tracked_individually(tmp_path):
+    _jsonl(tmp_path / "corpus.jsonl", [("j0", "first"), ("j1", "second")])
+    changed, deleted, manifest = scan(tmp_path, {})
+    assert [a["id"] for a in changed] == ["j0", "j1"]
+    assert article_ids(manifest) == {"j0", "j1"}
+
+    _jsonl(tmp_path / "corpus.jsonl", [("j0", "first"), ("j2", "third")])
+    changed, deleted, manifest = scan(tmp_path, manifest)
+    assert [a["id"] for a in changed] == ["j2"]
+    assert deleted == ["j1"]
+
+
+def _write(fp, text, mtime_ns=None):
+    fp.write_text(text)
+    if mtime_ns is not None:
+        os.utime(fp, ns=(mtime_ns, mtime_ns))
+
+
+def test_first_scan_sees_every_file(tmp_path):
+    _write(tmp_path / "a.txt", "alpha")
+    _write(tmp_path / "b.txt", "beta")
+    (tmp_path / "notes.md").write_text("ignored")
+    changed, deleted, manifest = scan(tmp_path, {})
+    assert [a["id"] for a in changed] == ["a", "b"]
+    assert deleted == []
+    assert manifest["config_version"] == config_version()
+
+
+def test_unchanged_mtime_and_size_skip_reading(tmp_path):
+    fp = tmp_path / "a.txt"
+    _write(fp, "alpha", 1_000_000_000)
+    _, _, manifest = scan(tmp_path, {})
+    # same size and mtime: trusted without being read, even though it differs
+    _write(fp, "ALPHA", 1_000_000_000)
+    changed, _, _ = scan(tmp_path, manifest)
+    assert changed == []
+
+
+def test_touched_but_identical_file_is_not_rerun(tmp_path):
+    fp = tmp_path / "a.txt"
+    _write(fp, "alpha", 1_000_000_000)
+    _, _, manifest = scan(tmp_path, {})
+    _write(fp, "alpha", 2_000_000_000)
+    changed, _, manifest = scan(tmp_path, manifest)
+    assert changed == []
+    assert manifest["files"][str(fp)]["mtime"] == 2_000_000_000
+
+
+def test_edited_file_is_rerun(tmp_path):
+    fp = tmp_path / "a.txt"
+    _write(fp, "alpha", 1_000_000_000)
+    _write(tmp_path / "b.txt", "beta")
+    _, _, manifest = scan(tmp_path, {})
+    _write(fp, "alpha, revised", 2_000_000_000)
+    changed, _, _ = scan(tmp_path, manifest)
+    assert changed == [{"id": "a", "text": "alpha, revised"}]
+
+
+def test_deleted_file_is_reported(tmp_path):
+    _write(tmp_path / "a.txt", "alpha")
+    _write(tmp_path / "b.txt", "beta")
+    _, _, manifest = scan(tmp_path, {})
+    (tmp_path / "a.txt").unlink()
+    changed, deleted, manifest = scan(tmp_path, manifest)
+    assert changed == [] and deleted == ["a"]
+    assert article_ids(manifest) == {"b"}
+
+
+def test_config_change_invalidates_everything(tmp_path, monkeypatch):
+    _write(tmp_path / "a.txt", "alpha")
+    _, _, manifest = scan(tmp_path, {})
+    monkeypatch.setattr(config, "OLLAMA_MODEL", "another-model")
+    changed, _, _ = scan(tmp_path, manifest)
+    assert [a["id"] for a in changed] == ["a"]
+
+
+def test_config_version_covers_only_versioned_settings(monkeypatch):
+    base = config_version()
+    monkeypatch.setattr(config, "BATCH_CONCURRENCY", 99)
+    assert config_version() == base
+    monkeypatch.setattr(config, "HEALTH_KEYWORDS", set(config.HEALTH_KEYWORDS) | {"zzz"})
+    assert config_version() != base
+
+
+def test_reads_entries_from_older_manifests(tmp_path):
+    fp = tmp_path / "a.txt"
+    _write(fp, "alpha", 1_000_000_000)
+    _, _, manifest = scan(tmp_path, {})
+    old = {"id": "a", "mtime": 0, "size": 0, "sha256": manifest["files"][str(fp)]["articles"]["a"]}
+    changed, deleted, _ = scan(tmp_path, {**manifest, "files": {str(fp): old}})
+    assert changed == [] and deleted == []
+
+
+def test_empty_manifest_is_not_replaced_by_the_saved_one(tmp_path, monkeypatch):
+    from manifest import save_manifest
+    monkeypatch.chdir(tmp_path)
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    _write(raw / "a.txt", "alpha")
+    _, _, manifest = scan(raw, {})
+    save_manifest(manifest)
+    changed, _, _ = scan(raw, {})
+    assert [a["id"] for a in changed] == ["a"]
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from metrics import Counter, Histogram
+
+
+def test_counter_by_label():
+    c = Counter("t_counter_total", "test")
+    c.inc(kind="a")
+    c.inc(3, kind="a")
+    c.inc(kind="b")
+    out = "\n".join(c.render())
+    assert 't_counter_total{kind="a"} 4' in out
+    assert 't_counter_total{kind="b"} 1' in out
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("t_hist_seconds", "test", buckets=(0.1, 1))
+    for v in (0.05, 0.5, 5):
+        h.observe(v)
+    out = "\n".join(h.render())
+    assert 't_hist_seconds_bucket{le="0.1"} 1' in out
+    assert 't_hist_seconds_bucket{le="1"} 2' in out
+    assert 't_hist_seconds_bucket{le="+Inf"} 3' in out
+    assert "t_hist_seconds_count 3" in out
+
+
+def test_time_fills_timings():
+    h = Histogram("t_timer_seconds", "test")
+    timings = {}
+    with h.time(timings, "stage", check="x"):
+        pass
+    with h.time(timings, "stage", check="x"):
+        pass
+    assert timings["stage"] >= 0
+    assert 't_timer_seconds_count{check="x"} 2' in "\n".join(h.render())
@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+import evaluator, profiles, summarizer
+from profiles import ProfileStore, get_profile, preprocess, profile_batch
+
+RAW = Path(__file__).resolve().parent.parent / "data" / "raw_articles"
+ARTICLE = (RAW / "covid.txt").read_text().strip()
+
+
+@pytest.fixture
+def parsed(monkeypatch):
+    """Stand-in NER that records which texts were parsed."""
+    seen = []
+
+    def fake(texts, **kw):
+        seen.extend(texts)
+        return [[{"text": "WHO", "label": "ORG"}] for _ in texts]
+
+    monkeypatch.setattr(profiles, "extract_entities_batch", fake)
+    monkeypatch.setattr(evaluator, "extract_entities_batch", fake)
+    return seen
+
+
+def test_profile_is_built_once_and_persisted(tmp_path, parsed):
+    store = ProfileStore(tmp_path)
+    p = get_profile(ARTICLE, store)
+    assert p["entities"] == [{"text": "WHO", "label": "ORG"}]
+    assert p["bounds"] == list(summarizer._target_bounds(ARTICLE))
+    assert get_profile(ARTICLE, ProfileStore(tmp_path)) == p
+    assert parsed == [ARTICLE]
+
+
+def test_new_pipeline_version_rebuilds(tmp_path, parsed, monkeypatch):
+    store = ProfileStore(tmp_path)
+    get_profile(ARTICLE, store)
+    monkeypatch.setattr(profiles, "PIPELINE_VERSION", profiles.PIPELINE_VERSION + 1)
+    assert store.get(get_profile(ARTICLE, store)["sha256"]) is not None
+    assert len(parsed) == 2
+
+
+def test_rejected_articles_skip_ner(tmp_path, parsed):
+    short, sport = "Too short.", "The match ended two nil after a quiet first half. " * 10
+    p_short, p_sport = profile_batch([short, sport], ProfileStore(tmp_path))
+    assert p_short["entities"] is None and not p_sport["health"]
+    assert parsed == []
+    with pytest.raises(summarizer.NotHealthContentError):
+        summarizer._target_bounds(sport, p_sport)
+
+
+def test_evaluate_batch_uses_profiled_entities(tmp_path, parsed, monkeypatch):
+    monkeypatch.setattr(evaluator, "toxicity_scores", lambda s: [None] * len(s))
+    prof = get_profile(ARTICLE, ProfileStore(tmp_path))
+    parsed.clear()
+    summary = "The WHO reported new cases."
+    res = evaluator.evaluate_batch([(ARTICLE, summary)], profiles=[prof])
+    assert parsed == [summary]
+    assert res[0]["entity_coverage"] == 1.0
+    assert res[0]["numeric"]["original_numbers"] == prof["numbers"]
+
+
+def test_preprocess_directory(tmp_path, parsed):
+    assert preprocess(RAW, ProfileStore(tmp_path)) == len(list(RAW.glob("*.txt")))
+    assert len(list(tmp_path.glob("*/*.json"))) == len(list(RAW.glob("*.txt")))
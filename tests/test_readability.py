@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from evaluator import _readability_counts, readability_batch, readability_scores
+
+textstat = pytest.importorskip("textstat")
+
+ARTICLES = sorted((Path(__file__).resolve().parent.parent / "data" / "raw_articles").glob("*.txt"))
+SAMPLES = [p.read_text(encoding="utf-8") for p in ARTICLES] + [
+    "Short.",
+    "Patients with type 2 diabetes saw HbA1c fall by 1.5% over 12 weeks. "
+    "Doctors don't know why. The WHO recommends screening adults over 45.",
+    # words where CMUdict and pyphen disagree; textstat uses pyphen
+    "Diabetes checks every evening keep the fire of good health burning.",
+]
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_counts_match_textstat(text):
+    assert _readability_counts(text) == (
+        textstat.sentence_count(text),
+        textstat.lexicon_count(text),
+        textstat.syllable_count(text),
+    )
+
+
+@pytest.mark.parametrize("text", SAMPLES)
+def test_scores_match_textstat(text):
+    rd = readability_scores(text)
+    assert rd["fkgl"] == pytest.approx(textstat.flesch_kincaid_grade(text), abs=1e-9)
+    assert rd["fre"] == pytest.approx(textstat.flesch_reading_ease(text), abs=1e-9)
+
+
+def test_batch_matches_single():
+    assert readability_batch(SAMPLES) == [readability_scores(t) for t in SAMPLES]
+
+
+def test_empty_text():
+    assert readability_batch(["", "  ...  "]) == [{"fkgl": 0.0, "fre": 0.0}] * 2
+    assert readability_batch([]) == []
@@ -0,0 +1,47 @@
+import sys, threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from store import ResultStore
+
+
+def _rec(i, level="Low", escalate=False, day="2026-01-01"):
+    return {
+        "article_id": f"a{i}",
+        "created_at": f"{day}T00:00:00+00:00",
+        "risk_level": level,
+        "escalate": escalate,
+    }
+
+
+def test_append_and_page(tmp_path):
+    s = ResultStore(tmp_path / "r.db")
+    s.append_many(_rec(i) for i in range(5))
+    assert s.count() == 5
+    assert [r["article_id"] for r in s.query(limit=2, offset=1)] == ["a1", "a2"]
+
+
+def test_filters(tmp_path):
+    s = ResultStore(tmp_path / "r.db")
+    s.append(_rec(0, "High", True, "2026-01-01"))
+    s.append(_rec(1, "Low", False, "2026-02-01"))
+    s.append(_rec(2, "High", False, "2026-03-01"))
+    assert s.count(risk_level="High") == 2
+    assert [r["article_id"] for r in s.query(escalate=True)] == ["a0"]
+    assert [r["article_id"] for r in s.query(since="2026-02-01")] == ["a1", "a2"]
+    assert [r["article_id"] for r in s.query(until="2026-02-01")] == ["a0"]
+
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    s = ResultStore(tmp_path / "r.db")
+
+    def work(n):
+        for i in range(25):
+            s.append(_rec(n * 100 + i))
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert s.count() == 100
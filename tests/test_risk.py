@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from risk import compute_risk
+
+CLEAN = {
+    "fkgl": 8.0, "entity_coverage": 0.9, "entity_coverage_low": False,
+    "missing_numbers": False, "hallucination_flag": False, "toxicity_flag": False,
+}
+
+
+def test_clean_summary_is_low_risk():
+    r = compute_risk(CLEAN, 50, 40, 60)
+    assert r["risk_level"] == "Low"
+    assert r["escalate"] is False
+
+
+def test_toxicity_flag_counts():
+    r = compute_risk({**CLEAN, "toxicity_flag": True}, 50, 40, 60)
+    assert r["flags"]["toxicity_flag"] is True
+    assert r["risk_level"] == "Medium"
+
+
+def test_two_flags_is_high_and_escalates():
+    r = compute_risk({**CLEAN, "toxicity_flag": True, "missing_numbers": True}, 50, 40, 60)
+    assert r["risk_level"] == "High"
+    assert r["escalate"] is True
+
+
+def test_missing_toxicity_score_is_not_a_flag():
+    evl = {k: v for k, v in CLEAN.items() if k != "toxicity_flag"}
+    assert compute_risk(evl, 50, 40, 60)["flags"]["toxicity_flag"] is False
@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from rouge_score import rouge_scorer
+
+from evaluator import rouge_scores, rouge_batch
+
+
+def test_no_reference_gives_none():
+    assert rouge_scores("A summary.") is None
+    assert rouge_scores("A summary.", "") is None
+
+
+def test_identical_text_scores_one():
+    text = "Vaccination reduced hospitalizations by 40% among older adults."
+    assert rouge_scores(text, text) == {"rouge1_f": 1.0, "rougeL_f": 1.0}
+
+
+def test_matches_stock_scorer():
+    ref = "The trial enrolled 1200 patients and reported improved outcomes."
+    summ = "Researchers enrolled patients in a trial reporting improving outcome rates."
+    stock = rouge_scorer.RougeScorer(["rouge1", "rougeL"], use_stemmer=True).score(ref, summ)
+    ours = rouge_scores(summ, ref)
+    assert ours["rouge1_f"] == round(stock["rouge1"].fmeasure, 4)
+    assert ours["rougeL_f"] == round(stock["rougeL"].fmeasure, 4)
+
+
+
+def test_batch_matches_single():
+    ref = "Insulin reduces glucose in blood."
+    pairs = [
+        ("Insulin lowers blood glucose.", ref),
+        ("Screening rates rose.", None),
+        ("Blood glucose falls with insulin therapy.", ref),
+        ("Insulin reduces glucose in blood.", ref),
+    ]
+    assert rouge_batch(pairs) == [rouge_scores(s, r) for s, r in pairs]
+    assert rouge_batch(pairs)[1] is None
+    assert rouge_batch(pairs)[3] == {"rouge1_f": 1.0, "rougeL_f": 1.0}
+
+
+def test_batch_tokenises_each_reference_once(monkeypatch):
+    import evaluator
+    tok = evaluator._get_rouge_tokenizer()
+    seen = []
+    real = tok.tokenize
+    monkeypatch.setattr(tok, "tokenize", lambda text: seen.append(text) or real(text))
+    ref = "The trial enrolled 1200 patients."
+    rouge_batch([(f"Summary {i} of the trial.", ref) for i in range(5)])
+    assert seen.count(ref) == 1
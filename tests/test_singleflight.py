@@ -0,0 +1,69 @@
+import asyncio, sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_run():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "summary"
+
+    async def main():
+        sf = SingleFlight()
+        out = await asyncio.gather(*(sf.run("k", work) for _ in range(5)))
+        return sf, out
+
+    sf, out = asyncio.run(main())
+    assert calls == [1]
+    assert [r for r, _ in out] == ["summary"] * 5
+    assert sorted(shared for _, shared in out) == [False] + [True] * 4
+    assert len(sf) == 0
+
+
+def test_different_keys_and_later_calls_run_again():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        sf = SingleFlight()
+        await asyncio.gather(sf.run("a", work), sf.run("b", work))
+        return await sf.run("a", work)
+
+    assert asyncio.run(main()) == (3, False)
+
+
+def test_errors_reach_every_waiter():
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad input")
+
+    async def main():
+        sf = SingleFlight()
+        return await asyncio.gather(*(sf.run("k", boom) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(main()))
+
+
+def test_cancelled_leader_does_not_cancel_followers():
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        sf = SingleFlight()
+        leader = asyncio.ensure_future(sf.run("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(sf.run("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == ("done", True)
@@ -0,0 +1,210 @@
+import asyncio, sys, threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+import summarizer
+from benchmarks.mock_ollama import MockOllama
+from config import MAX_RETRIES, SYSTEM_PROMPT, OLLAMA_KEEP_ALIVE, summary_bounds
+from utils import count_words
+
+ARTICLE = (Path(__file__).resolve().parent.parent / "data" / "raw_articles" / "covid.txt").read_text()
+
+
+@pytest.fixture
+def mock(monkeypatch):
+    with MockOllama() as m:
+        monkeypatch.setattr(summarizer, "OLLAMA_BASE_URL", m.url)
+        yield m
+
+
+def test_fit_needs_no_retry(mock):
+    r = summarizer.summarize(ARTICLE, use_cache=False)
+    assert r["retries"] == 0
+    assert r["target_min"] <= r["word_count"] <= r["target_max"]
+
+
+def test_retries_until_in_window(mock):
+    mock.mode = "cycle"   # over, under, fit
+    r = summarizer.summarize(ARTICLE, use_cache=False)
+    assert r["retries"] == 2
+    assert len(mock.requests) == 3
+
+
+def test_gives_up_after_max_retries(mock):
+    mock.mode = "under"
+    r = summarizer.summarize(ARTICLE, use_cache=False)
+    assert r["retries"] == MAX_RETRIES
+    assert r["word_count"] < r["target_min"]
+
+
+def test_keeps_best_candidate_not_last(mock, monkeypatch):
+    monkeypatch.setattr(summarizer, "MAX_RETRIES", 1)
+    mock.script = ["under", "over"]
+    r = summarizer.summarize(ARTICLE, use_cache=False)
+    assert r["retries"] == 1 and r["candidates"] == 2
+    assert r["word_count"] < r["target_min"]
+    assert r["wasted_tokens"] > r["target_max"]
+
+
+def test_parallel_candidates(mock, monkeypatch):
+    monkeypatch.setattr(summarizer, "SUMMARY_CANDIDATES", 3)
+    mock.script = ["over", "fit", "under"]
+    r = summarizer.summarize(ARTICLE, use_cache=False)
+    assert len(mock.requests) == 3
+    assert r["retries"] == 0 and r["candidates"] == 3
+    assert r["target_min"] <= r["word_count"] <= r["target_max"]
+    assert r["wasted_tokens"] > 0
+
+
+def test_token_budget_stops_retries(mock, monkeypatch):
+    monkeypatch.setattr(summarizer, "RETRY_TOKEN_BUDGET", 1)
+    mock.mode = "under"
+    r = summarizer.summarize(ARTICLE, use_cache=False)
+    assert r["retries"] == 0
+    assert len(mock.requests) == 1
+
+
+def test_system_prompt_and_keep_alive_sent_separately(mock):
+    summarizer.summarize(ARTICLE, use_cache=False)
+    req = mock.requests[0]
+    assert req["system"] == SYSTEM_PROMPT
+    assert SYSTEM_PROMPT not in req["prompt"]
+    assert req["keep_alive"] == OLLAMA_KEEP_ALIVE
+    assert "context" not in req
+
+
+def test_retry_continues_from_context(mock):
+    mock.mode = "under"
+    summarizer.summarize(ARTICLE, use_cache=False)
+    first, retry = mock.requests[0], mock.requests[1]
+    assert "context" in retry
+    assert ARTICLE.split("\n")[0] in first["prompt"]
+    assert ARTICLE.split("\n")[0] not in retry["prompt"]
+    assert len(retry["prompt"].split()) < 60
+
+
+def test_retry_after_cutoff_resends_article(mock):
+    mock.script = ["over", "fit"]
+    r = summarizer.summarize(ARTICLE, use_cache=False)
+    assert r["retries"] == 1
+    assert "context" not in mock.requests[1]
+    assert ARTICLE.split("\n")[0] in mock.requests[1]["prompt"]
+
+
+def test_async_matches_sync(mock):
+    sync = summarizer.summarize(ARTICLE, use_cache=False)
+
+    async def run():
+        try:
+            return await summarizer.summarize_async(ARTICLE, use_cache=False)
+        finally:
+            await summarizer.close_async_client()
+
+    res = asyncio.run(run())
+    res.pop("timings"), sync.pop("timings")
+    assert res == sync
+
+
+def test_rejects_non_health_text(mock):
+    with pytest.raises(summarizer.NotHealthContentError):
+        summarizer.summarize("The match ended two nil after a quiet first half. " * 5)
+    assert mock.requests == []
+
+
+def test_chunks_are_sentence_aligned():
+    text = " ".join(f"Sentence number {i} has six words." for i in range(40))
+    chunks = summarizer._split_chunks(text, max_words=50)
+    assert len(chunks) > 1
+    assert all(count_words(c) <= 50 for c in chunks)
+    assert all(c.endswith(".") for c in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_short_text_is_one_chunk():
+    assert summarizer._split_chunks("One short sentence. And another.") == ["One short sentence. And another."]
+
+
+def test_unpunctuated_text_is_still_split():
+    bullets = "\n".join(f"- item {i} with a few more words" for i in range(30))
+    chunks = summarizer._split_chunks(bullets, max_words=50)
+    assert len(chunks) > 1 and all(count_words(c) <= 50 for c in chunks)
+    assert " ".join(chunks).split() == bullets.split()
+
+    scraped = " ".join(f"w{i}" for i in range(130))
+    chunks = summarizer._split_chunks(scraped, max_words=50)
+    assert [count_words(c) for c in chunks] == [50, 50, 30]
+    assert " ".join(chunks) == scraped
+
+
+# long enough to need the map step, short enough for one reduce pass
+LONG = "\n\n".join([ARTICLE.strip()] * 10)
+
+
+def _peak(monkeypatch, name, is_async):
+    """Wrap summarizer.<name> and record the most calls ever in flight at once."""
+    real, lock = getattr(summarizer, name), threading.Lock()
+    state = {"now": 0, "peak": 0}
+
+    def enter():
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+
+    def leave():
+        with lock:
+            state["now"] -= 1
+
+    if is_async:
+        async def wrapped(*args, **kw):
+            enter()
+            try:
+                return await real(*args, **kw)
+            finally:
+                leave()
+    else:
+        def wrapped(*args, **kw):
+            enter()
+            try:
+                return real(*args, **kw)
+            finally:
+                leave()
+    monkeypatch.setattr(summarizer, name, wrapped)
+    return state
+
+
+def _check_condensed(r, mock):
+    chunks = len(summarizer._split_chunks(LONG))
+    assert chunks > 2
+    assert r["chunks"] == chunks
+    assert all(req["prompt"].startswith("Summarize this section") for req in mock.requests[:chunks])
+    reduce = mock.requests[chunks]["prompt"]
+    assert "summaries of consecutive sections" in reduce
+    assert count_words(reduce) < count_words(LONG) / 2
+    # the window comes from the full original, not the condensed notes
+    assert (r["target_min"], r["target_max"]) == summary_bounds(count_words(LONG))
+
+
+def test_condense_maps_chunks_then_reduces(mock, monkeypatch):
+    monkeypatch.setattr(summarizer, "CHUNK_CONCURRENCY", 2)
+    mock.latency = 0.05
+    peak = _peak(monkeypatch, "_call_ollama", is_async=False)
+    r = summarizer.summarize(LONG, use_cache=False)
+    _check_condensed(r, mock)
+    assert peak["peak"] == 2
+
+
+def test_condense_async_maps_chunks_then_reduces(mock, monkeypatch):
+    monkeypatch.setattr(summarizer, "CHUNK_CONCURRENCY", 2)
+    mock.latency = 0.05
+    peak = _peak(monkeypatch, "_call_ollama_async", is_async=True)
+
+    async def run():
+        try:
+            return await summarizer.summarize_async(LONG, use_cache=False)
+        finally:
+            await summarizer.close_async_client()
+
+    _check_condensed(asyncio.run(run()), mock)
+    assert peak["peak"] == 2
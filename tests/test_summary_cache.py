@@ -0,0 +1,48 @@
+import os, sys, time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cache import SummaryCache, cache_key
+
+OPTS = {"temperature": 0.3, "num_predict": 400}
+
+
+def test_key_is_stable():
+    a = cache_key("text", "m", "sys", (25, 40), OPTS)
+    b = cache_key("text", "m", "sys", (25, 40), dict(OPTS))
+    assert a == b
+
+
+def test_key_changes_with_any_input():
+    base = cache_key("text", "m", "sys", (25, 40), OPTS)
+    assert cache_key("text2", "m", "sys", (25, 40), OPTS) != base
+    assert cache_key("text", "m2", "sys", (25, 40), OPTS) != base
+    assert cache_key("text", "m", "sys2", (25, 40), OPTS) != base
+    assert cache_key("text", "m", "sys", (25, 41), OPTS) != base
+    assert cache_key("text", "m", "sys", (25, 40), {"temperature": 0.5}) != base
+
+
+def test_round_trip(tmp_path):
+    c = SummaryCache(tmp_path)
+    assert c.get("ab" * 32) is None
+    c.put("ab" * 32, {"summary": "x", "word_count": 1})
+    assert c.get("ab" * 32) == {"summary": "x", "word_count": 1}
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    c = SummaryCache(tmp_path, max_age_days=1)
+    c.put("cd" * 32, {"summary": "x"})
+    old = time.time() - 2 * 86400
+    os.utime(c._path("cd" * 32), (old, old))
+    assert c.get("cd" * 32) is None
+
+
+def test_prune_keeps_newest(tmp_path):
+    c = SummaryCache(tmp_path, max_entries=2)
+    keys = [f"{i:02d}" * 32 for i in range(4)]
+    for i, k in enumerate(keys):
+        c.put(k, {"i": i})
+        os.utime(c._path(k), (1000 + i, 1000 + i))
+    c.max_age = float("inf")
+    c.prune()
+    assert [c.get(k) for k in keys] == [None, None, {"i": 2}, {"i": 3}]
@@ -0,0 +1,66 @@
+import sys, types
+from collections import OrderedDict
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+import evaluator
+from evaluator import toxicity_scores
+
+
+class FakeDetoxify:
+    instances = []
+
+    def __init__(self, model, device):
+        self.batches = []
+        FakeDetoxify.instances.append(self)
+
+    def predict(self, texts):
+        self.batches.append(list(texts))
+        return {"toxicity": [0.9 if "awful" in t else 0.01 for t in texts]}
+
+
+@pytest.fixture
+def detox(monkeypatch):
+    FakeDetoxify.instances = []
+    monkeypatch.setitem(sys.modules, "torch", types.SimpleNamespace(set_num_threads=lambda n: None))
+    monkeypatch.setitem(sys.modules, "detoxify", types.SimpleNamespace(Detoxify=FakeDetoxify))
+    monkeypatch.setattr(evaluator, "TOXICITY_ENABLED", True)
+    monkeypatch.setattr(evaluator, "TOXICITY_BATCH_SIZE", 2)
+    monkeypatch.setattr(evaluator, "_detox", None)
+    monkeypatch.setattr(evaluator, "_tox_cache", OrderedDict())
+    return FakeDetoxify.instances
+
+
+def test_model_loads_lazily_once(detox):
+    assert detox == []
+    toxicity_scores(["a"])
+    toxicity_scores(["b"])
+    assert len(detox) == 1
+
+
+def test_empty_input_does_not_load_the_model(detox):
+    assert toxicity_scores([]) == []
+    assert detox == []
+
+
+def test_scores_in_batches_and_dedupes(detox):
+    texts = ["one", "an awful two", "three", "one", "four", "five"]
+    scores = toxicity_scores(texts)
+    assert scores == [0.01, 0.9, 0.01, 0.01, 0.01, 0.01]
+    assert detox[0].batches == [["one", "an awful two"], ["three", "four"], ["five"]]
+
+
+def test_cached_texts_are_not_rescored(detox, monkeypatch):
+    monkeypatch.setattr(evaluator, "TOXICITY_CACHE_SIZE", 2)
+    toxicity_scores(["a", "b"])
+    toxicity_scores(["a", "c"])   # "a" cached; "c" evicts the oldest entry
+    assert detox[0].batches == [["a", "b"], ["c"]]
+    assert len(evaluator._tox_cache) == 2
+
+
+def test_disabled_gives_none(detox, monkeypatch):
+    monkeypatch.setattr(evaluator, "TOXICITY_ENABLED", False)
+    assert toxicity_scores(["x", "y"]) == [None, None]
+    assert detox == []
@@ -1,13 +1,36 @@
-import json, os, re
+import csv, hashlib, json, logging, mmap, os, re, tempfile
+from collections import deque
 from pathlib import Path
-import pandas as pd
 
 from config import (
-    RESULTS_DIR, SUMMARIES_FILE, EVALUATION_FILE,
-    HEALTH_KEYWORDS, MIN_HEALTH_KEYWORD_HITS,
+    RESULTS_DIR, SUMMARIES_FILE, EVALUATION_FILE, EVALUATION_PARQUET_FILE,
+    SUMMARIES_JSONL_FILE, EXPORT_PARQUET, EXPORT_JSONL,
+    HEALTH_KEYWORDS, MIN_HEALTH_KEYWORD_HITS, REFERENCE_DIR,
+    RAW_ARTICLES_DIR, PROCESSED_DIR, MMAP_THRESHOLD_BYTES,
 )
+from metrics import CORPUS_BAD_LINES, WRITE_SECONDS
+
+log = logging.getLogger(__name__)
 
 NUMBER_PATTERN = re.compile(r"\d+(?:\.\d+)?%?")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+
+
+def _compile_keywords(keywords):
+    """Split keywords into a single-word set and multi-word phrases indexed by last word."""
+    single, phrases = set(), {}
+    for kw in keywords:
+        parts = tuple(WORD_PATTERN.findall(kw.lower()))
+        if len(parts) == 1:
+            single.add(parts[0])
+        elif parts:
+            phrases.setdefault(parts[-1], []).append(parts)
+    longest = max((len(p) for ps in phrases.values() for p in ps), default=1)
+    return single, phrases, longest
+
+
+_HEALTH_SINGLE, _HEALTH_PHRASES, _HEALTH_MAX_LEN = _compile_keywords(HEALTH_KEYWORDS)
 
 
 def count_words(text):
@@ -20,44 +43,277 @@ def extract_numbers(text):
 
 
 def is_health_content(text):
-    """Quick keyword check — rejects non-medical text before it reaches the LLM."""
-    lower = text.lower()
-    words = set(lower.split())
-    hits = sum(1 for kw in HEALTH_KEYWORDS if kw in words or kw in lower)
-    return hits >= MIN_HEALTH_KEYWORD_HITS
+    """Quick keyword check — rejects non-medical text before it reaches the LLM.
+
+    One pass over the words with set lookups (whole words only, so "who"
+    does not fire on "whole"), stopping as soon as enough distinct
+    keywords have been seen.
+    """
+    seen = set()
+    window = deque(maxlen=_HEALTH_MAX_LEN)
+    for m in WORD_PATTERN.finditer(text.lower()):
+        w = m.group(0)
+        window.append(w)
+        if w in _HEALTH_SINGLE:
+            seen.add(w)
+        for phrase in _HEALTH_PHRASES.get(w, ()):
+            if len(window) >= len(phrase) and tuple(window)[-len(phrase):] == phrase:
+                seen.add(phrase)
+        if len(seen) >= MIN_HEALTH_KEYWORD_HITS:
+            return True
+    return False
 
 
 def ensure_dirs():
-    for d in (RESULTS_DIR, "data/raw_articles", "data/processed"):
+    for d in (RESULTS_DIR, RAW_ARTICLES_DIR, PROCESSED_DIR):
         os.makedirs(d, exist_ok=True)
 
 
-def save_summaries_json(records):
-    ensure_dirs()
-    with open(SUMMARIES_FILE, "w") as f:
-        json.dump(records, f, indent=2)
+def load_summaries_json():
+    if not os.path.exists(SUMMARIES_FILE):
+        return []
+    with open(SUMMARIES_FILE) as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return []
+
+
+EVALUATION_COLUMNS = [
+    "article_id", "word_count", "target_range", "fkgl", "fre",
+    "entity_coverage", "missing_numbers", "hallucination_flag",
+    "toxicity_flag", "risk_level", "escalate",
+]
+
+
+# mkstemp creates 0600 files; exports should get the usual umask-based mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _publish(tmp, path):
+    os.chmod(tmp, 0o666 & ~_UMASK)
+    os.replace(tmp, path)
+
+
+class _AtomicFile:
+    """Write to a temp file next to `path`; rename over it only on success."""
+
+    def __init__(self, path, newline=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        self.f = os.fdopen(fd, "w", encoding="utf-8", newline=newline)
+
+    def commit(self):
+        self.f.close()
+        _publish(self.tmp, self.path)
+
+    def abort(self):
+        self.f.close()
+        if os.path.exists(self.tmp):
+            os.unlink(self.tmp)
+
+
+class ResultWriter:
+    """Streams records to the summaries JSON and evaluation CSV as they are produced.
+
+    Only one record is held at a time. Nothing replaces the existing files
+    until close() commits, so an aborted run leaves the previous exports intact.
+    """
+
+    def __init__(self, summaries_path=SUMMARIES_FILE, evaluation_path=EVALUATION_FILE,
+                 parquet_path=None, jsonl_path=None):
+        self._json = self._csv = self._parquet = self._jsonl = None
+        try:
+            self._json = _AtomicFile(summaries_path)
+            self._csv = _AtomicFile(evaluation_path, newline="")
+            self._parquet = _ParquetSink(parquet_path) if parquet_path else None
+            self._jsonl = _AtomicFile(jsonl_path) if jsonl_path else None
+        except BaseException:
+            # e.g. pyarrow missing: drop the temp files already opened
+            for sink in (self._json, self._csv, self._parquet, self._jsonl):
+                if sink:
+                    sink.abort()
+            raise
+        self._rows = csv.DictWriter(self._csv.f, EVALUATION_COLUMNS, extrasaction="ignore")
+        self._rows.writeheader()
+        self._json.f.write("[")
+        self.count = 0
+
+    def write(self, rec):
+        with WRITE_SECONDS.time(writer="export_row"):
+            self._write(rec)
+
+    def _write(self, rec):
+        line = json.dumps(rec)
+        self._json.f.write(("\n" if not self.count else ",\n") + line)
+        self._rows.writerow(rec)
+        if self._parquet:
+            self._parquet.write(rec)
+        if self._jsonl:
+            self._jsonl.f.write(line + "\n")
+        self.count += 1
+
+    def close(self, commit=True):
+        sinks = [x for x in (self._json, self._csv, self._parquet, self._jsonl) if x]
+        if commit:
+            self._json.f.write("\n]\n")
+        for sink in sinks:
+            sink.commit() if commit else sink.abort()
 
+    def __enter__(self):
+        return self
 
-def save_evaluation_csv(records):
-    ensure_dirs()
-    cols = [
-        "article_id", "word_count", "target_range", "fkgl", "fre",
-        "entity_coverage", "missing_numbers", "hallucination_flag",
-        "risk_level", "escalate",
-    ]
-    df = pd.DataFrame(records)
-    for c in cols:
-        if c not in df.columns:
-            df[c] = None
-    df[cols].to_csv(EVALUATION_FILE, index=False)
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
 
 
-def load_articles(directory="data/raw_articles"):
-    """Read every .txt file in the directory, return list of {id, text}."""
-    articles = []
+def open_exports(parquet=EXPORT_PARQUET, jsonl=EXPORT_JSONL):
+    """A ResultWriter for the standard exports, plus whichever optional ones are on."""
+    return ResultWriter(
+        parquet_path=EVALUATION_PARQUET_FILE if parquet else None,
+        jsonl_path=SUMMARIES_JSONL_FILE if jsonl else None,
+    )
+
+
+def save_results(records, parquet=EXPORT_PARQUET, jsonl=EXPORT_JSONL):
+    """Export summaries.json and evaluation.csv (and Parquet/JSONL) in one streaming pass."""
+    with WRITE_SECONDS.time(writer="export"):
+        with open_exports(parquet, jsonl) as w:
+            for rec in records:
+                w._write(rec)
+
+
+class _ParquetSink:
+    """Evaluation columns as Parquet, flushed in row groups of `chunk` records."""
+
+    def __init__(self, path, chunk=1000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).") from exc
+        self._pa = pa
+        self.schema = pa.schema([
+            ("article_id", pa.string()), ("word_count", pa.int64()),
+            ("target_range", pa.string()), ("fkgl", pa.float64()), ("fre", pa.float64()),
+            ("entity_coverage", pa.float64()), ("missing_numbers", pa.bool_()),
+            ("hallucination_flag", pa.bool_()), ("toxicity_flag", pa.bool_()),
+            ("risk_level", pa.string()),
+            ("escalate", pa.bool_()),
+        ])
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        os.close(fd)
+        self._w = pq.ParquetWriter(self.tmp, self.schema)
+        self.chunk = chunk
+        self._buf = []
+
+    def _flush(self):
+        if self._buf:
+            self._w.write_table(self._pa.Table.from_pylist(self._buf, self.schema))
+            self._buf = []
+
+    def write(self, rec):
+        self._buf.append({c: rec.get(c) for c in EVALUATION_COLUMNS})
+        if len(self._buf) >= self.chunk:
+            self._flush()
+
+    def commit(self):
+        self._flush()
+        self._w.close()
+        _publish(self.tmp, self.path)
+
+    def abort(self):
+        self._w.close()
+        if os.path.exists(self.tmp):
+            os.unlink(self.tmp)
+
+
+def shard_of(article_id, num_shards):
+    """Stable shard number for an article id (same in every process, unlike hash())."""
+    digest = hashlib.blake2b(article_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % num_shards
+
+
+def _read_text(fp, size):
+    if size == 0 or size < MMAP_THRESHOLD_BYTES:
+        return fp.read_text(encoding="utf-8")
+    # decode straight out of the page cache instead of buffering the bytes first
+    with open(fp, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            return str(view, "utf-8")
+
+
+def iter_jsonl(fp):
+    """Yield {id, text} per line of a JSONL corpus; missing ids become <stem>_<line>.
+
+    A malformed line is logged with its line number and skipped, so one bad
+    record never aborts the rest of the corpus.
+    """
+    with open(fp, encoding="utf-8") as f:
+        for n, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+                text = obj.get("text", "")
+                if not isinstance(text, str):
+                    raise ValueError(f"text is {type(text).__name__}, not a string")
+            except (ValueError, AttributeError) as exc:
+                CORPUS_BAD_LINES.inc()
+                log.warning("%s:%d: skipping malformed line (%s)", fp, n + 1, exc)
+                continue
+            yield {"id": str(obj.get("id") or f"{fp.stem}_{n}"), "text": text.strip()}
+
+
+def iter_articles(directory=RAW_ARTICLES_DIR, shard=None, num_shards=None, start=0, stop=None):
+    """Yield {id, text} one article at a time.
+
+    Reads one-file-per-article .txt files and .jsonl/.ndjson corpora (one
+    {"id", "text"} object per line), in file-name order. `shard`/`num_shards`
+    keeps only articles whose id hashes to that shard; `start`/`stop` keeps
+    an index range of the stream, so several workers can split one directory.
+    """
     folder = Path(directory)
     if not folder.exists():
-        return articles
-    for fp in sorted(folder.glob("*.txt")):
-        articles.append({"id": fp.stem, "text": fp.read_text(encoding="utf-8").strip()})
-    return articles
+        return
+    names = sorted(e.name for e in os.scandir(folder) if e.is_file())
+    idx = -1
+    for name in names:
+        fp = folder / name
+        if fp.suffix == ".txt":
+            items = [(fp.stem, fp)]
+        elif fp.suffix in JSONL_SUFFIXES:
+            items = iter_jsonl(fp)
+        else:
+            continue
+        for item in items:
+            idx += 1
+            if idx < start:
+                continue
+            if stop is not None and idx >= stop:
+                return
+            if isinstance(item, tuple):
+                aid, path = item
+                if num_shards and shard_of(aid, num_shards) != shard:
+                    continue
+                yield {"id": aid, "text": _read_text(path, path.stat().st_size).strip()}
+            elif not num_shards or shard_of(item["id"], num_shards) == shard:
+                yield item
+
+
+def load_articles(directory=RAW_ARTICLES_DIR):
+    """Read every article in the directory, return list of {id, text}."""
+    return list(iter_articles(directory))
+
+
+def load_reference(article_id, directory=REFERENCE_DIR):
+    """Gold summary for an article, or None when there isn't one."""
+    fp = Path(directory) / f"{article_id}.txt"
+    if not fp.is_file():
+        return None
+    return fp.read_text(encoding="utf-8").strip() or None